@@ -0,0 +1,140 @@
+"""
+Translation cache memory benchmark.
+
+Fill a cache with a translation for every Pokemon species, as loaded from a
+`pokepi pretranslate` index, and report how many bytes each entry costs (as
+measured by `tracemalloc`) and how long a lookup takes, for:
+
+- `dict`: a plain dict keyed by `(name, language)` tuples;
+- `store`: a `pokepi.store.TextStore`;
+- `compressed`: a `TextStore` compressing the texts with a sampled dictionary.
+
+Without an index file the translations are generated from a small vocabulary,
+for `--species` species (the full set known to PokeAPI by default). Generated
+text compresses about as well as real Pokedex entries, which reuse the same
+words over and over, but the real index gives the real numbers.
+
+Usage:
+
+    $ python benchmarks/cache_memory.py [--index FILE] [--species N] [--languages N]
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from pokepi.cache import read_records
+from pokepi.store import TextStore, sample_zdict
+
+
+WORDS = (
+    "thou thee thy art hath doth shall prithee verily forsooth anon "
+    "pokemon it its when the a an of to in and with is are be by from "
+    "enemy body fire water tail wings flies swims sleeps battle trainer "
+    "strong power attack moves fast wild forest cave sea mountain night "
+    "day light dark flame electric psychic poison grass stone ground ice "
+    "ghost dragon steel fairy bug fighting flying normal rock egg evolves "
+    "shell horn claws fangs eyes seeds petals sparks spits breath "
+    "gentle fierce loyal rare seen said hunts guards nests glows"
+).split()
+
+
+def generated_records(species, languages, seed=0):
+    "Return index records generated from `WORDS`."
+    rnd = random.Random(seed)
+    return [
+        {
+            "name": f"species-{number}",
+            "language": f"lang-{language}",
+            "translation": " ".join(rnd.choices(WORDS, k=rnd.randint(18, 30)))
+            .capitalize()
+            .replace(" it ", ". It ")
+            + ".",
+        }
+        for number in range(species)
+        for language in range(languages)
+    ]
+
+
+def fill_dict(records):
+    "Return a plain dict cache of `records` and its lookup function."
+    cache = {}
+    for record in records:
+        cache[(record["name"], record["language"])] = record["translation"]
+    return cache, lambda name, language: cache.get((name, language))
+
+
+def fill_store(records, compress=False):
+    "Return a `TextStore` of `records` and its lookup function."
+    zdict = (
+        sample_zdict(record["translation"] for record in records) if compress else b""
+    )
+    store = TextStore(compress, zdict)
+    for record in records:
+        store.put(record["name"], record["language"], record["translation"])
+    return store, store.get
+
+
+def measure(fill, records):
+    """
+    Return (bytes per entry, µs per lookup) of the cache filled by `fill`.
+
+    Records are parsed from JSON lines while tracing allocations, as when
+    loading an index file, and dropped once the cache is filled: what is left
+    is the memory held by the cache.
+    """
+    lines = [json.dumps(record) for record in records]
+    keys = [(record["name"], record["language"]) for record in records]
+
+    gc.collect()
+    tracemalloc.start()
+    loaded = [json.loads(line) for line in lines]
+    cache, get = fill(loaded)
+    del loaded
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for name, language in keys:
+        get(name, language)
+    elapsed = time.perf_counter() - start
+
+    del cache
+    return size / len(keys), elapsed / len(keys) * 1e6
+
+
+def main():
+    "Parse the command line and run the benchmark."
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--index", help="index file written by pokepi pretranslate")
+    parser.add_argument("--species", type=int, default=1025)
+    parser.add_argument("--languages", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.index:
+        records = list(read_records(args.index))
+    else:
+        records = generated_records(args.species, args.languages)
+
+    text = sum(len(record["translation"].encode("utf-8")) for record in records)
+    print(f"{len(records)} entries, {text / len(records):.1f} bytes of text each")
+    print(f"{'':<12}{'bytes/entry':>12}{'total KiB':>12}{'µs/get':>10}")
+
+    for name, fill in (
+        ("dict", fill_dict),
+        ("store", fill_store),
+        ("compressed", lambda records: fill_store(records, compress=True)),
+    ):
+        per_entry, lookup = measure(fill, records)
+        print(
+            f"{name:<12}{per_entry:>12.1f}"
+            f"{per_entry * len(records) / 1024:>12.1f}{lookup:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
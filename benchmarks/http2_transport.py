@@ -0,0 +1,223 @@
+"""
+HTTP/1.1 vs HTTP/2 provider transport benchmark.
+
+Start two local servers answering every request with a small JSON document
+after a fixed latency, one speaking HTTP/1.1 and one speaking HTTP/2 (clear
+text, prior knowledge), then send the same concurrent load through:
+
+- `http1`: the current transport, a `RetryingSession` per call as the
+  providers do, which opens a new connection for each call;
+- `http2`: the `HTTP2Adapter`, whose client is shared by all the calls.
+
+For each transport the report shows throughput, latency percentiles and how
+many TCP connections the server accepted.
+
+Usage (requires the `http2` extra):
+
+    $ python benchmarks/http2_transport.py [--threads N] [--requests N] [--latency S]
+"""
+
+import argparse
+import http.server
+import json
+import socket
+import socketserver
+import statistics
+import threading
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+import requests as rr
+
+from pokepi.providers.common import HTTP2Adapter, Retry, RetryingSession
+
+
+BODY = json.dumps({"contents": {"translated": "x" * 200}}).encode()
+
+
+class Counter:
+    "Thread-safe counter."
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def increment(self):
+        with self._lock:
+            self.value += 1
+
+
+def http1_server(latency, connections):
+    "Return a running HTTP/1.1 server."
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            connections.increment()
+            super().setup()
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def http2_server(latency, connections):
+    "Return a running HTTP/2 (clear text, prior knowledge) server."
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            connections.increment()
+            conn = h2.connection.H2Connection(
+                h2.config.H2Configuration(client_side=False)
+            )
+            lock = threading.Lock()
+
+            def respond(stream_id):
+                time.sleep(latency)
+                with lock:
+                    conn.send_headers(
+                        stream_id,
+                        [
+                            (":status", "200"),
+                            ("content-type", "application/json"),
+                            ("content-length", str(len(BODY))),
+                        ],
+                    )
+                    conn.send_data(stream_id, BODY, end_stream=True)
+                    self.request.sendall(conn.data_to_send())
+
+            with lock:
+                conn.initiate_connection()
+                self.request.sendall(conn.data_to_send())
+
+            while True:
+                try:
+                    data = self.request.recv(65535)
+                except OSError:
+                    return
+                if not data:
+                    return
+
+                with lock:
+                    events = conn.receive_data(data)
+                    self.request.sendall(conn.data_to_send())
+
+                for event in events:
+                    if isinstance(event, h2.events.RequestReceived):
+                        threading.Thread(
+                            target=respond, args=(event.stream_id,), daemon=True
+                        ).start()
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def http1_get(url):
+    "Send a request as the providers do today."
+    with RetryingSession(http2=False) as http:
+        return http.get(url)
+
+
+def http2_get_factory(client):
+    "Return a function sending a request with a `HTTP2Adapter` using `client`."
+
+    def http2_get(url):
+        session = rr.Session()
+        session.mount(
+            "http://",
+            HTTP2Adapter(max_retries=Retry(5, backoff_factor=2), client=client),
+        )
+        with session:
+            return session.get(url)
+
+    return http2_get
+
+
+def run(get, url, threads, requests):
+    "Send `requests` requests from each of `threads` threads, return latencies."
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            get(url).raise_for_status()
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(name, elapsed, latencies, connections):
+    "Print a report line."
+    print(
+        f"{name:<8}{len(latencies) / elapsed:>10.1f}"
+        f"{statistics.median(latencies) * 1000:>10.1f}"
+        f"{latencies[int(len(latencies) * 0.95)] * 1000:>10.1f}"
+        f"{connections:>13}"
+    )
+
+
+def main():
+    "Parse the command line and run the benchmark."
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(f"{'':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'connections':>13}")
+
+    connections = Counter()
+    server = http1_server(args.latency, connections)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    elapsed, latencies = run(http1_get, url, args.threads, args.requests)
+    report("http1", elapsed, latencies, connections.value)
+    server.shutdown()
+
+    connections = Counter()
+    server = http2_server(args.latency, connections)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    client = httpx.Client(
+        http1=False, http2=True, limits=httpx.Limits(max_connections=10)
+    )
+    elapsed, latencies = run(
+        http2_get_factory(client), url, args.threads, args.requests
+    )
+    report("http2", elapsed, latencies, connections.value)
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Import-time profiling report.
+
+Import a module in a fresh interpreter with `python -X importtime` and report
+the slowest imports, both by cumulative and by self time.
+
+Usage:
+
+    $ python benchmarks/import_time.py [--top N] [--runs N] [module]
+
+The module defaults to `pokepi.app` (what a gunicorn worker imports when the
+application is not preloaded). Times are the median over `--runs` runs, in
+milliseconds.
+"""
+
+import argparse
+import collections
+import statistics
+import subprocess
+import sys
+
+
+def import_times(module):
+    "Return {imported module: (self µs, cumulative µs)} for a fresh import of `module`."
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return times
+
+
+def report(module, top, runs):
+    "Print the import-time report for `module`."
+    samples = collections.defaultdict(list)
+    for _ in range(runs):
+        for name, value in import_times(module).items():
+            samples[name].append(value)
+
+    medians = {
+        name: (
+            statistics.median(value[0] for value in values) / 1000,
+            statistics.median(value[1] for value in values) / 1000,
+        )
+        for name, values in samples.items()
+    }
+
+    print(f"import {module}: {medians[module][1]:.1f} ms, {len(medians)} modules")
+
+    for title, index in (("cumulative", 1), ("self", 0)):
+        print(f"\nTop {top} by {title} time (ms):")
+        ranking = sorted(medians.items(), key=lambda item: item[1][index], reverse=True)
+        for name, value in ranking[:top]:
+            print(f"  {value[index]:8.1f}  {name}")
+
+
+def main():
+    "Parse the command line and print the report."
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("module", nargs="?", default="pokepi.app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    report(args.module, args.top, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Latency breakdown of exported spans.
+
+Read the spans written by the `file` tracing exporter (see `pokepi.tracing`)
+and report, for each span name, how many spans there are and their latency
+distribution. The self time is the span duration minus the duration of its
+direct children, i.e. the time spent in the span's own code (or waiting on
+sockets for client spans).
+
+Usage:
+
+    $ python benchmarks/span_breakdown.py [spans.jsonl]
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import statistics
+
+
+def parse_time(value):
+    "Parse an OpenTelemetry ISO timestamp (nanoseconds are truncated)."
+    date, fraction = value.rstrip("Z").split(".")
+    return datetime.datetime.fromisoformat(f"{date}.{fraction[:6]}")
+
+
+def load_spans(path):
+    "Return {span_id: span} of the spans stored in `path`."
+    spans = {}
+    with open(path, encoding="utf-8") as lines:
+        for line in lines:
+            if not line.strip():
+                continue
+
+            span = json.loads(line)
+            span["duration"] = (
+                parse_time(span["end_time"]) - parse_time(span["start_time"])
+            ).total_seconds() * 1000
+            spans[span["context"]["span_id"]] = span
+
+    return spans
+
+
+def percentile(values, fraction):
+    "Return the `fraction` percentile of the sorted `values`."
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(spans):
+    "Print the latency breakdown of `spans`."
+    children = collections.defaultdict(float)
+    for span in spans.values():
+        if span["parent_id"] in spans:
+            children[span["parent_id"]] += span["duration"]
+
+    durations = collections.defaultdict(list)
+    self_durations = collections.defaultdict(list)
+    for span_id, span in spans.items():
+        durations[span["name"]].append(span["duration"])
+        self_durations[span["name"]].append(span["duration"] - children[span_id])
+
+    print(
+        f"{'span':<36}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'max ms':>10}{'self ms':>10}"
+    )
+    for name, values in sorted(
+        durations.items(), key=lambda item: sum(item[1]), reverse=True
+    ):
+        values.sort()
+        print(
+            f"{name:<36}{len(values):>8}"
+            f"{percentile(values, 0.5):>10.1f}{percentile(values, 0.95):>10.1f}"
+            f"{values[-1]:>10.1f}{statistics.mean(self_durations[name]):>10.1f}"
+        )
+
+
+def main():
+    "Parse the command line and print the report."
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("path", nargs="?", default="pokepi-spans.jsonl")
+    args = parser.parse_args()
+
+    report(load_spans(args.path))
+
+
+if __name__ == "__main__":
+    main()
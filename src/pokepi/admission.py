@@ -0,0 +1,128 @@
+"""
+Admission control.
+
+When the upstream services slow down, requests pile up in the application
+server queue until clients give up: serving them is wasted work. To avoid it
+requests that need upstream calls (i.e. cache misses) are admitted only if:
+
+- the number of such requests in flight in the worker is below a given limit,
+- and they didn't wait in the server queue longer than a given time, measured
+  from the `X-Request-Start` header set by the load balancer/proxy (e.g. with
+  nginx `proxy_set_header X-Request-Start "t=${msec}";`).
+
+Otherwise they are rejected straight away with a `503 Service Unavailable`
+and a `Retry-After` header. Cache hits are cheap and always served.
+
+Settings:
+
+- `POKEPI_MAX_IN_FLIGHT` (default `0`, i.e. unlimited): upstream requests in
+  flight per worker
+- `POKEPI_MAX_QUEUE_TIME` (default `0`, i.e. unlimited): maximum time, in
+  seconds, a request needing upstream calls may have been queued
+- `POKEPI_RETRY_AFTER` (default `1`): seconds sent in the `Retry-After` header
+"""
+
+import contextlib
+import threading
+import time
+
+from pokepi.settings import env_float, env_int
+
+
+REQUEST_START_HEADER = "X-Request-Start"
+
+
+class Overloaded(Exception):
+    "The request can't be admitted."
+
+
+def parse_request_start(value):
+    """
+    Return the epoch time (in seconds) in a `X-Request-Start` header value.
+
+    The value may be prefixed by `t=` and be expressed in seconds, milliseconds
+    or microseconds (as set by different proxies). Return `None` if invalid.
+    """
+    if value is None:
+        return None
+
+    value = value.strip()
+    if value.startswith("t="):
+        value = value[2:]
+
+    try:
+        timestamp = float(value)
+    except ValueError:
+        return None
+
+    if timestamp > 1e14:
+        return timestamp / 1e6
+    if timestamp > 1e11:
+        return timestamp / 1e3
+
+    return timestamp
+
+
+class AdmissionController:
+    """
+    Bound the requests needing upstream calls in flight in the worker.
+    """
+
+    def __init__(self, max_in_flight=0, max_queue_time=0.0, retry_after=1):
+        self.max_in_flight = max_in_flight
+        self.max_queue_time = max_queue_time
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        "Create an admission controller configured by the env-variables."
+        return cls(
+            max_in_flight=env_int("MAX_IN_FLIGHT", 0),
+            max_queue_time=env_float("MAX_QUEUE_TIME", 0.0),
+            retry_after=env_int("RETRY_AFTER", 1),
+        )
+
+    @contextlib.contextmanager
+    def admit(self, queue_time=None):
+        """
+        Run the block as an admitted request, or raise `Overloaded`.
+
+        `queue_time` is how long the request waited before being served, in
+        seconds, if known.
+        """
+        with self._lock:
+            if self.max_queue_time and (queue_time or 0) > self.max_queue_time:
+                self.shed += 1
+                raise Overloaded(f"Request queued for {queue_time:.3f}s")
+
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                raise Overloaded(f"{self.in_flight} requests in flight")
+
+            self.in_flight += 1
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def status(self):
+        "Return the saturation of the worker."
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "saturation": (
+                self.in_flight / self.max_in_flight if self.max_in_flight else 0.0
+            ),
+            "shed": self.shed,
+        }
+
+
+def queue_time(headers, now=time.time):
+    "Return how long the request with `headers` has been queued, or `None`."
+    start = parse_request_start(headers.get(REQUEST_START_HEADER))
+    return None if start is None else max(0.0, now() - start)
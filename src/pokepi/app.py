@@ -2,23 +2,72 @@
 Pokepi app.
 """
 
-from flask import Flask, abort, json, jsonify
-from flask.logging import default_handler
-from pythonjsonlogger import jsonlogger
-from werkzeug.exceptions import HTTPException
+import uuid
 
+from flask import Flask, abort, g, json, jsonify, request, send_file
+from werkzeug.exceptions import HTTPException, ServiceUnavailable
+
+from pokepi import providers
+from pokepi.admission import AdmissionController, Overloaded, queue_time
+from pokepi.cache import TranslationCache
+from pokepi.log import configure_logging
+from pokepi.profiling import Profiler, check_token, describe
 from pokepi.providers import ResourceNotFound, pokeapi_processor, shakespeare_processor
+from pokepi.providers.common import retry_status
+from pokepi.providers.pokeapi import LANGUAGE, described_language, resolve_language
+from pokepi.tracing import TracingMiddleware, configure_tracing, set_attributes, span
+
 
+REQUEST_ID_HEADER = "X-Request-ID"
+
+logging_pipeline = configure_logging()  # pylint: disable=invalid-name
+tracer_provider = configure_tracing()  # pylint: disable=invalid-name
 
 app = Flask(__name__)
+app.wsgi_app = TracingMiddleware(app.wsgi_app)
 
-default_handler.setFormatter(
-    jsonlogger.JsonFormatter(
-        "%(levelname)s %(message)s %(module)s %(levelname)s %(lineno)s",
-        timestamp=True,
-        datefmt="%Y-%m-%dT%H:%M:%S%z",
-    )
-)
+profiler = Profiler.from_settings()  # pylint: disable=invalid-name
+
+# Loaded at import time: with `preload_app` the master loads it once for all
+# the workers.
+cache = TranslationCache.from_settings()  # pylint: disable=invalid-name
+
+admission = AdmissionController.from_settings()  # pylint: disable=invalid-name
+
+
+def preload():
+    """
+    Build the application's shared state upfront.
+
+    When gunicorn runs with `preload_app` this is called once in the master
+    process (see `pokepi.gunicorn_config`) and the forked workers share the
+    result.
+    """
+    providers.preload()
+
+
+@app.before_request
+def set_request_id():
+    "Use the caller's request ID, if any, to correlate log records and spans."
+    g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+    set_attributes({"http.route": str(request.url_rule), "request_id": g.request_id})
+
+
+@app.before_request
+def measure_queue_time():
+    "Measure how long the request waited before being served, if possible."
+    g.queue_time = queue_time(request.headers)
+
+    if g.queue_time is not None:
+        set_attributes({"queue_time": g.queue_time})
+
+
+@app.after_request
+def add_request_id(response):
+    "Send the request ID back to the caller."
+    response.headers[REQUEST_ID_HEADER] = g.request_id
+    return response
 
 
 @app.errorhandler(HTTPException)
@@ -38,19 +87,105 @@ def handle_exception(exception):
 
 @app.route("/health")
 def health_endpoint():
-    "Application's health-check endpoint."
+    """
+    Application's health-check endpoint.
+
+    Besides the health, report the saturation of the worker serving it (see
+    `pokepi.admission`) and the retries it spent calling each provider (see
+    `pokepi.providers.common.RetryBudget`).
+    """
+
+    return jsonify({"health": "ok", **admission.status(), "retries": retry_status()})
+
+
+def requested_languages():
+    """
+    Return the PokeAPI languages of the description acceptable to the client.
+
+    The `language` query parameter has the precedence over the
+    `Accept-Language` header, and must name a known language: otherwise the
+    request is aborted with a `404`. The header only states preferences, its
+    unknown languages are ignored and English, the default, is always
+    acceptable as the last resort. Languages are resolved (see
+    `resolve_language`) so that equivalent requests share the cached
+    translations, and are returned by preference.
+    """
+    language = request.args.get("language")
+    if language:
+        resolved = resolve_language(language)
+        if resolved is None:
+            abort(404)
+
+        return [resolved]
+
+    languages = []
+    for language, _ in request.accept_languages:
+        if language == "*":
+            break
+
+        resolved = resolve_language(language)
+        if resolved is not None and resolved not in languages:
+            languages.append(resolved)
+
+    if LANGUAGE not in languages:
+        languages.append(LANGUAGE)
 
-    return jsonify({"health": "ok"})
+    return languages
+
+
+def cached_translation(name, language):
+    "Return the cached translation for the Pokemon `name` in `language`, if any."
+    with span("cache.get", {"pokemon.name": name, "language": language}) as lookup:
+        translated_description = cache.get(name, language)
+        if lookup is not None:
+            lookup.set_attribute("cache.hit", translated_description is not None)
+
+    return translated_description
+
+
+def description_response(name, description):
+    "Return the JSON response for the `description` of the Pokemon `name`."
+    response = jsonify({"name": name, "description": description})
+    response.vary.add("Accept-Language")
+    return response
 
 
 @app.route("/pokemon/<name>")
+@profiler.profiled
 def pokemon_endpoint(name):
-    "Return the Shakesperean description of the Pokemon named as `<name>`."
+    """
+    Return the Shakesperean description of the Pokemon named as `<name>`.
+
+    The description language can be chosen with the `language` query parameter
+    or the `Accept-Language` header (see `requested_languages`): the first
+    language the Pokemon has a description in is served.
+
+    Cached descriptions in the preferred language are always served, requests
+    needing upstream calls are rejected with a `503` when the worker is
+    overloaded.
+    """
+    language, *fallbacks = requested_languages()
+
+    translated_description = cached_translation(name, language)
+    if translated_description is not None:
+        return description_response(name, translated_description)
 
     try:
-        description = pokeapi_processor(name)
+        with admission.admit(g.queue_time):
+            if fallbacks:
+                language = described_language(name, [language, *fallbacks])
+                translated_description = cached_translation(name, language)
+
+            if translated_description is None:
+                description = pokeapi_processor(name, language)
 
-        translated_description = shakespeare_processor(description)
+                translated_description = shakespeare_processor(description)
+
+                cache.put(name, translated_description, language)
+    except Overloaded as exc:
+        app.logger.warning("Request shed: %s", exc)  # pylint: disable=no-member
+
+        raise ServiceUnavailable(retry_after=admission.retry_after) from None
     except ResourceNotFound as exc:
         app.logger.exception(exc)  # pylint: disable=no-member
 
@@ -60,4 +195,40 @@ def pokemon_endpoint(name):
 
         abort(500)
 
-    return jsonify({"name": name, "description": translated_description})
+    return description_response(name, translated_description)
+
+
+def require_admin():
+    "Abort unless the request carries the admin token as a bearer token."
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+
+    if scheme.lower() != "bearer" or not check_token(profiler.token, token):
+        abort(404)
+
+
+@app.route("/admin/profiles")
+def profiles_endpoint():
+    "List the stored request profiles, the most recent first."
+    require_admin()
+
+    return jsonify({"profiles": [describe(path) for path in profiler.profiles()]})
+
+
+@app.route("/admin/profiles/<filename>")
+def profile_endpoint(filename):
+    """
+    Download the request profile called `<filename>`.
+
+    With `?format=text` return the functions with the highest cumulative time
+    instead of the raw `cProfile` dump.
+    """
+    require_admin()
+
+    path = profiler.find(filename)
+    if path is None:
+        abort(404)
+
+    if request.args.get("format") == "text":
+        return profiler.summary(path), 200, {"Content-Type": "text/plain"}
+
+    return send_file(str(path), mimetype="application/octet-stream", as_attachment=True)
@@ -0,0 +1,115 @@
+"""
+In-process cache of the translated descriptions.
+
+The cache can be pre-filled from an index file, written by the `pokepi
+pretranslate` command (see `pokepi.cli`), holding one JSON object per line:
+
+    {"name": "ditto", "language": "en", "description": "...", "translation": "..."}
+
+Records without a `language` are in English. Lines that can't be parsed (e.g.
+the last one of an interrupted run) are skipped. Species with no description in
+the language are recorded as skipped, so that resuming the command doesn't
+fetch them again, and are ignored by the cache:
+
+    {"name": "ditto", "language": "cs", "skipped": true}
+
+Translations are kept in a `pokepi.store.TextStore`, so a cache holding the
+whole index costs little more than the text itself.
+
+Settings:
+
+- `POKEPI_CACHE_FILE` (default empty): index file loaded at start-up
+- `POKEPI_CACHE_COMPRESS` (default `false`): compress the cached translations,
+  with a zlib dictionary sampled from the index file
+"""
+
+import json
+import logging
+
+from pokepi.providers.pokeapi import LANGUAGE
+from pokepi.settings import env_bool, env_str
+from pokepi.store import TextStore, sample_zdict
+
+
+log = logging.getLogger(__name__)
+
+FIELDS = ("name", "language", "translation")
+SKIPPED_FIELDS = ("name", "language")
+
+
+def read_records(path, skipped=False):
+    """
+    Yield the records stored in the index file at `path`.
+
+    The records of the skipped species are yielded as well if `skipped`.
+    """
+    with open(path, encoding="utf-8") as lines:
+        for number, line in enumerate(lines, 1):
+            is_skipped = False
+            try:
+                record = dict({"language": LANGUAGE}, **json.loads(line))
+                is_skipped = record.get("skipped") is True
+                fields = SKIPPED_FIELDS if is_skipped else FIELDS
+                valid = all(isinstance(record[key], str) for key in fields)
+            except (ValueError, KeyError, TypeError):
+                valid = False
+
+            if not valid:
+                log.warning("Skipping invalid record at %s:%s", path, number)
+            elif skipped or not is_skipped:
+                yield record
+
+
+def write_record(stream, record):
+    "Append `record` to the index file opened as `stream`."
+    stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+    stream.flush()
+
+
+class TranslationCache:
+    """
+    Map Pokemon names and languages to their translated descriptions.
+
+    The cache can be shared by the worker's threads, see `TextStore`.
+    """
+
+    def __init__(self, compress=False, zdict=b""):
+        self._translations = TextStore(compress, zdict)
+
+    @classmethod
+    def load(cls, path, compress=False):
+        "Return a cache holding the translations stored in the index at `path`."
+        records = list(read_records(path))
+        zdict = (
+            sample_zdict(record["translation"] for record in records)
+            if compress
+            else b""
+        )
+
+        cache = cls(compress, zdict)
+        for record in records:
+            cache.put(record["name"], record["translation"], record["language"])
+
+        return cache
+
+    @classmethod
+    def from_settings(cls):
+        "Return a cache pre-filled with the index file `POKEPI_CACHE_FILE`, if any."
+        path = env_str("CACHE_FILE")
+        compress = env_bool("CACHE_COMPRESS")
+        return cls.load(path, compress) if path else cls(compress)
+
+    def get(self, name, language=LANGUAGE):
+        "Return the translation for `name` in `language`, or `None` if not cached."
+        return self._translations.get(name, language)
+
+    def put(self, name, translation, language=LANGUAGE):
+        "Store the `translation` for `name` in `language`."
+        self._translations.put(name, language, translation)
+
+    def __len__(self):
+        return len(self._translations)
+
+    def __contains__(self, key):
+        "Whether `(name, language)` is cached."
+        return key in self._translations
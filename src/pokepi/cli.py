@@ -0,0 +1,255 @@
+"""
+Pokepi command line interface.
+
+    $ pokepi pretranslate [--output FILE] [--language L] [--workers N] [--rate N]
+                          [--period S]
+
+`pretranslate` fetches the description, in the given language (English by
+default), of every Pokemon species known to PokeAPI, translates it, and appends
+the result to an index file that can be loaded by the application at start-up
+(see `pokepi.cache`).
+
+Species are processed by a bounded pool of threads, while calls to the
+translation API are throttled to `--rate` calls every `--period` seconds (the
+defaults match the free tier of api.funtranslations.com). Each translation is
+written as soon as it is available, so the index file doubles as a checkpoint:
+running the command again skips the species already translated, and retries
+the failed ones. Species with no description in the language are recorded as
+skipped rather than failed, and are not fetched again either.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import logging
+import os
+import sys
+import threading
+import time
+
+from pokepi.cache import read_records, write_record
+from pokepi.log import configure_logging
+from pokepi.providers import (
+    ProviderError,
+    ResourceNotFound,
+    ValidationError,
+    pokeapi_processor,
+    shakespeare_processor,
+)
+from pokepi.providers.pokeapi import LANGUAGE, list_pokemon_species, resolve_language
+from pokepi.settings import env_str
+
+
+log = logging.getLogger(__name__)
+
+
+class Cancelled(Exception):
+    "The job has been cancelled."
+
+
+class RateLimiter:
+    """
+    Allow at most `rate` calls to `acquire()` every `period` seconds.
+
+    Callers block until they are allowed to proceed, unless the limiter is
+    stopped in which case `Cancelled` is raised.
+    """
+
+    def __init__(self, rate, period, clock=time.monotonic):
+        self.rate = rate
+        self.period = period
+        self.clock = clock
+        self._calls = collections.deque()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def acquire(self):
+        "Block until a call is allowed."
+        while True:
+            with self._lock:
+                now = self.clock()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+
+                if len(self._calls) < self.rate:
+                    self._calls.append(now)
+                    return
+
+                wait = self.period - (now - self._calls[0])
+
+            if self._stopped.wait(wait):
+                raise Cancelled("Rate limiter stopped")
+
+    def stop(self):
+        "Wake up and cancel the blocked callers."
+        self._stopped.set()
+
+
+def translate_species(name, language, limiter):
+    """
+    Return the index record for the Pokemon species `name` in `language`.
+
+    If the species has no description in `language` it is recorded as skipped.
+    """
+    try:
+        description = pokeapi_processor(name, language)
+    except ResourceNotFound as exc:
+        log.info("Skipping %s: %s", name, exc)
+        return {"name": name, "language": language, "skipped": True}
+
+    # Retries would bypass the limiter, failed species are retried by the next
+    # run instead.
+    limiter.acquire()
+    translation = shakespeare_processor(description, retry=False)
+
+    return {
+        "name": name,
+        "language": language,
+        "description": description,
+        "translation": translation,
+    }
+
+
+def translated_names(path, language):
+    """
+    Return the names already translated to, or skipped for, `language` in the
+    index at `path`.
+    """
+    if not os.path.exists(path):
+        return set()
+
+    return {
+        record["name"]
+        for record in read_records(path, skipped=True)
+        if record["language"] == language
+    }
+
+
+def open_index(path):
+    "Open the index file for appending, after the last complete line."
+    truncated = False
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, "rb") as index:
+            index.seek(-1, os.SEEK_END)
+            truncated = index.read(1) != b"\n"
+
+    stream = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+    if truncated:
+        stream.write("\n")
+
+    return stream
+
+
+def pretranslate(path, workers, limiter, language=LANGUAGE):
+    """
+    Translate all the species not yet in the index file at `path`.
+
+    Return the number of translated, skipped and failed species.
+    """
+    done = translated_names(path, language)
+    pending = [name for name in list_pokemon_species() if name not in done]
+
+    log.info("Translating %s species, %s already done", len(pending), len(done))
+
+    translated = skipped = failed = 0
+
+    with open_index(path) as stream, concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers
+    ) as executor:
+        futures = {
+            executor.submit(translate_species, name, language, limiter): name
+            for name in pending
+        }
+
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    record = future.result()
+                    write_record(stream, record)
+                    if record.get("skipped"):
+                        skipped += 1
+                    else:
+                        translated += 1
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Failed translating %s", futures[future])
+                    failed += 1
+        except KeyboardInterrupt:
+            limiter.stop()
+            for future in futures:
+                future.cancel()
+            raise
+
+    return translated, skipped, failed
+
+
+def language_arg(value):
+    "Return the PokeAPI language `value` resolves to, for argparse."
+    language = resolve_language(value)
+    if language is None:
+        raise argparse.ArgumentTypeError(f"unknown language: {value!r}")
+
+    return language
+
+
+def parse_args(argv):
+    "Parse the command line arguments."
+    parser = argparse.ArgumentParser(prog="pokepi", description="Pokepi utilities.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser(
+        "pretranslate", help="Translate every species description ahead of time."
+    )
+    command.add_argument(
+        "--output",
+        default=env_str("CACHE_FILE"),
+        required=env_str("CACHE_FILE") is None,
+        help="index file to write (default: POKEPI_CACHE_FILE)",
+    )
+    command.add_argument(
+        "--language",
+        type=language_arg,
+        default=LANGUAGE,
+        help=f"description language (default: {LANGUAGE})",
+    )
+    command.add_argument(
+        "--workers", type=int, default=4, help="concurrent species (default: 4)"
+    )
+    command.add_argument(
+        "--rate", type=int, default=5, help="translations per period (default: 5)"
+    )
+    command.add_argument(
+        "--period", type=float, default=3600, help="period in seconds (default: 3600)"
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    "Command line entry point."
+    args = parse_args(argv)
+
+    configure_logging()
+
+    try:
+        translated, skipped, failed = pretranslate(
+            args.output,
+            args.workers,
+            RateLimiter(args.rate, args.period),
+            args.language,
+        )
+    except KeyboardInterrupt:
+        log.warning("Interrupted, run the command again to resume")
+        return 130
+    except (ProviderError, ValidationError):
+        log.exception("Failed listing the Pokemon species")
+        return 1
+
+    log.info(
+        "Translated %s species, %s skipped, %s failed", translated, skipped, failed
+    )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration.
+
+Use it with `gunicorn --config python:pokepi.gunicorn_config pokepi.app:app`,
+any setting can still be overridden via `GUNICORN_CMD_ARGS`.
+
+Settings:
+
+- `POKEPI_PRELOAD_APP` (default `true`): import the application and build its
+  heavy state (see `pokepi.app.preload`) once in the master process, before
+  forking the workers. Workers then share those memory pages copy-on-write and
+  start serving without paying the import cost again.
+"""
+
+import gc
+
+from pokepi.settings import env_bool
+
+
+preload_app = env_bool("PRELOAD_APP", True)  # pylint: disable=invalid-name
+
+
+def when_ready(server):  # pylint: disable=unused-argument
+    """
+    Warm the application up in the master, right before spawning workers.
+
+    Objects alive at this point are moved to the permanent generation so that
+    the garbage collector running in the workers does not touch (and therefore
+    copy) the pages they live in.
+    """
+    if not preload_app:
+        return
+
+    from pokepi.app import preload  # pylint: disable=import-outside-toplevel
+
+    preload()
+
+    gc.freeze()
@@ -0,0 +1,222 @@
+"""
+Non-blocking logging pipeline.
+
+Records emitted by any `pokepi.*` logger are put on a bounded in-memory queue
+by a `QueueHandler`; a `QueueListener` thread formats them as JSON objects and
+writes them to `stderr`. Request threads only pay for a couple of filters and
+a `put_nowait()`, tracebacks are formatted by the listener thread.
+
+On top of that:
+
+- each record is tagged with the `request_id` of the request being served (see
+  `pokepi.app`), so that log lines can be correlated;
+- repeated records (same logger, level, message and exception type) are rate
+  limited, the first emitted record after a suppression period reports how
+  many were dropped in its `suppressed` field;
+- if the queue is full records are dropped rather than blocking the request.
+
+Settings:
+
+- `POKEPI_LOG_LEVEL` (default `INFO`)
+- `POKEPI_LOG_QUEUE_SIZE` (default `10000`): maximum number of queued records
+- `POKEPI_LOG_RATE_LIMIT` (default `10`): repeated records emitted per window,
+  `0` disables rate limiting
+- `POKEPI_LOG_RATE_WINDOW` (default `60`): rate limiting window, in seconds
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+from flask import g, has_request_context
+from pythonjsonlogger import jsonlogger
+
+from pokepi.settings import env_float, env_int, env_str
+
+
+LOGGER_NAME = "pokepi"
+
+FORMAT = "%(levelname)s %(message)s %(module)s %(lineno)s %(request_id)s"
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+MAX_KEYS = 1024
+
+_PIPELINES = {}
+_PIPELINES_LOCK = threading.Lock()
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Tag records with the ID of the request being served.
+
+    Records emitted outside of a request have a `None` request ID.
+    """
+
+    def filter(self, record):
+        record.request_id = g.get("request_id") if has_request_context() else None
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most `rate` similar records every `window` seconds.
+
+    Records are similar if they come from the same logger, with the same level,
+    message template and exception type. The first record let through after
+    some similar ones have been dropped has a `suppressed` attribute holding
+    their number.
+    """
+
+    def __init__(self, rate, window, clock=time.monotonic):
+        super().__init__()
+        self.rate = rate
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    @staticmethod
+    def key(record):
+        "Return the key used to group similar records."
+        exc_type = record.exc_info[0] if record.exc_info else None
+        msg = record.msg if isinstance(record.msg, str) else type(record.msg)
+        return (record.name, record.levelno, msg, exc_type)
+
+    def filter(self, record):
+        key = self.key(record)
+        now = self.clock()
+
+        with self._lock:
+            start, count, suppressed = self._counters.get(key, (now, 0, 0))
+
+            if now - start >= self.window:
+                start, count = now, 0
+
+            if count >= self.rate:
+                self._counters[key] = (start, count, suppressed + 1)
+                return False
+
+            if key not in self._counters and len(self._counters) >= MAX_KEYS:
+                self._counters.clear()
+            self._counters[key] = (start, count + 1, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    `QueueHandler` that never blocks nor formats on the calling thread.
+
+    When the queue is full the record is dropped and counted in `dropped`.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The default implementation formats the whole record, traceback
+        # included: merge just the message arguments and leave the rest to the
+        # listener's handler.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingPipeline:
+    """
+    Bind together the queue, its handler and the listener thread.
+
+    The listener thread does not survive a `fork()`, so the pipeline is
+    restarted in child processes (e.g. the gunicorn workers when the
+    application is preloaded in the master).
+    """
+
+    def __init__(self, handler, queue_size):
+        self.target = handler
+        self.queue_size = queue_size
+        self.handler = DroppingQueueHandler(queue.Queue(queue_size))
+        self.listener = None
+
+    def start(self):
+        "Start the listener thread."
+        self.listener = logging.handlers.QueueListener(
+            self.handler.queue, self.target, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def stop(self):
+        "Flush the queued records and stop the listener thread."
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def restart_after_fork(self):
+        "Start afresh in a forked child, the parent's queue lock could be held."
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.listener = None
+        self.start()
+
+
+def json_handler(stream=None):
+    "Return a handler writing JSON formatted records to `stream`."
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(
+        jsonlogger.JsonFormatter(FORMAT, timestamp=True, datefmt=DATE_FORMAT)
+    )
+    return handler
+
+
+def configure_logging(logger_name=LOGGER_NAME, stream=None):
+    """
+    Set up the logging pipeline for `logger_name` and its children.
+
+    It must be called before Flask creates `app.logger`, otherwise Flask adds
+    its own (blocking) default handler. The logger stops propagating records to
+    the root logger, whose handlers (e.g. gunicorn's) would write them on the
+    calling thread, and a second time. The pipeline is set up once per logger:
+    later calls return it as is, ignoring `stream`.
+    """
+    with _PIPELINES_LOCK:
+        if logger_name in _PIPELINES:
+            return _PIPELINES[logger_name]
+
+        pipeline = LoggingPipeline(
+            json_handler(stream), env_int("LOG_QUEUE_SIZE", 10000)
+        )
+
+        pipeline.handler.addFilter(RequestIdFilter())
+
+        rate = env_int("LOG_RATE_LIMIT", 10)
+        if rate > 0:
+            pipeline.handler.addFilter(
+                RateLimitFilter(rate, env_float("LOG_RATE_WINDOW", 60.0))
+            )
+
+        logger = logging.getLogger(logger_name)
+        logger.setLevel(env_str("LOG_LEVEL", "INFO").upper())
+        logger.addHandler(pipeline.handler)
+        logger.propagate = False
+
+        pipeline.start()
+
+        atexit.register(pipeline.stop)
+        os.register_at_fork(after_in_child=pipeline.restart_after_fork)
+
+        _PIPELINES[logger_name] = pipeline
+
+        return pipeline
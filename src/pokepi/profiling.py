@@ -0,0 +1,173 @@
+"""
+Opt-in request profiling.
+
+Requests can be profiled with `cProfile` either on demand, sending the admin
+token in the `X-Pokepi-Profile` header, or at random with a given sampling
+rate. Profiles are written to a directory that keeps just the most recent
+ones, and can be listed and downloaded via the admin endpoints (see
+`pokepi.app`). Downloaded files can be inspected with `pstats` or any tool
+reading `cProfile` dumps.
+
+Settings:
+
+- `POKEPI_PROFILING_DIR` (default empty, i.e. disabled): where profiles are
+  written
+- `POKEPI_PROFILING_SAMPLE_RATE` (default `0`): fraction of the requests to
+  profile
+- `POKEPI_PROFILING_MAX_FILES` (default `100`): number of profiles to keep
+- `POKEPI_ADMIN_TOKEN` (default empty): token enabling on demand profiling and
+  the admin endpoints
+"""
+
+import cProfile
+import functools
+import hmac
+import io
+import logging
+import os
+import pathlib
+import pstats
+import random
+import re
+import threading
+import time
+
+from flask import g, request
+
+from pokepi.settings import env_float, env_int, env_str
+
+
+log = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Pokepi-Profile"
+SUFFIX = ".prof"
+MAX_REQUEST_ID_LENGTH = 64
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def check_token(expected, given):
+    """
+    Compare tokens in constant time, an empty `expected` token never matches.
+
+    Tokens are compared as bytes: header values may hold any character.
+    """
+    return bool(expected) and hmac.compare_digest(
+        expected.encode("utf-8"), (given or "").encode("utf-8", "surrogateescape")
+    )
+
+
+class Profiler:
+    """
+    Profile the requests and manage the rotating directory of profiles.
+
+    Only one request at a time is profiled: a profiler can't be enabled while
+    another one is running, requests arriving meanwhile are simply served.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        directory=None,
+        sample_rate=0.0,
+        max_files=100,
+        token=None,
+        rand=random.random,
+    ):
+        self.directory = pathlib.Path(directory) if directory else None
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.token = token
+        self.rand = rand
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        "Create a profiler configured by the env-variables."
+        return cls(
+            directory=env_str("PROFILING_DIR"),
+            sample_rate=env_float("PROFILING_SAMPLE_RATE", 0.0),
+            max_files=env_int("PROFILING_MAX_FILES", 100),
+            token=env_str("ADMIN_TOKEN"),
+        )
+
+    @property
+    def enabled(self):
+        "Whether profiles can be written at all."
+        return self.directory is not None
+
+    def should_profile(self):
+        "Whether the current request has to be profiled."
+        if not self.enabled:
+            return False
+
+        header = request.headers.get(PROFILE_HEADER)
+        if header is not None and check_token(self.token, header):
+            return True
+
+        return self.sample_rate > 0 and self.rand() < self.sample_rate
+
+    def profiled(self, view):
+        "Decorate a Flask `view` to profile it when required."
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.should_profile() or not self._lock.acquire(blocking=False):
+                return view(*args, **kwargs)
+
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(view, *args, **kwargs)
+            finally:
+                self._lock.release()
+                self.save(profile, view.__name__)
+
+        return wrapper
+
+    def save(self, profile, name):
+        """
+        Write `profile` to the profiles directory and drop the oldest ones.
+
+        The request ID, sent by the client, is sanitized and truncated to be
+        part of the filename. Failures are logged: profiling must never change
+        the response.
+        """
+        request_id = g.get("request_id") or ""
+        request_id = _UNSAFE_CHARS.sub("_", request_id[:MAX_REQUEST_ID_LENGTH])
+        filename = f"{time.time_ns()}-{name}-{request_id}{SUFFIX}"
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(self.directory / filename)
+
+            for path in self.profiles()[self.max_files :]:
+                path.unlink(missing_ok=True)
+        except OSError:
+            log.exception("Failed saving profile %s", filename)
+
+    def profiles(self):
+        "Return the paths of the stored profiles, the most recent first."
+        if not self.enabled or not self.directory.is_dir():
+            return []
+
+        return sorted(self.directory.glob(f"*{SUFFIX}"), reverse=True)
+
+    def find(self, filename):
+        "Return the path of the profile called `filename`, or `None`."
+        for path in self.profiles():
+            if path.name == filename:
+                return path
+        return None
+
+    @staticmethod
+    def summary(path, limit=30):
+        "Return the top `limit` functions by cumulative time, as text."
+        out = io.StringIO()
+        stats = pstats.Stats(str(path), stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        return out.getvalue()
+
+
+def describe(path):
+    "Return a JSON serializable description of the profile at `path`."
+    stat = os.stat(path)
+    return {"name": path.name, "size": stat.st_size, "created": stat.st_mtime}
@@ -4,3 +4,18 @@ Providers module.
 from pokepi.providers.common import ProviderError, ResourceNotFound, ValidationError
 from pokepi.providers.pokeapi import pokeapi_processor
 from pokepi.providers.shakespeare import shakespeare_processor
+
+
+def preload():
+    """
+    Set up every provider's shared state upfront.
+
+    This is meant to be called once in the gunicorn master (see
+    `pokepi.gunicorn_config`) so that workers share it, instead of creating
+    their own on their first request.
+    """
+    # pylint: disable=import-outside-toplevel
+    from pokepi.providers import pokeapi, shakespeare
+
+    pokeapi.preload()
+    shakespeare.preload()
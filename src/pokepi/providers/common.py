@@ -1,13 +1,60 @@
 """
 Wire utilities used by providers' implementations.
+
+Settings, for each provider (`POKEAPI`, `SHAKESPEARE`), see `RetryPolicy`:
+
+- `POKEPI_<PROVIDER>_MAX_RETRIES` (default `5`)
+- `POKEPI_<PROVIDER>_BACKOFF_FACTOR` (default `2`): minimum delay, in seconds,
+  before a retry
+- `POKEPI_<PROVIDER>_MAX_BACKOFF` (default `30`): maximum delay, in seconds,
+  before a retry
+- `POKEPI_<PROVIDER>_RETRY_BUDGET` (default `0.2`): retries allowed as a
+  fraction of the requests sent in the last 10 seconds, on top of
+- `POKEPI_<PROVIDER>_RETRY_BUDGET_MIN` (default `10`) retries
 """
 
+import collections
 import contextlib
+import functools
+import os
+import random
+import threading
+import time
 
 import requests as rr
 import schema
 import urllib3
 
+from pokepi.settings import env_bool, env_float, env_int
+from pokepi.tracing import add_event, inject_headers, set_attributes, span, traced
+
+
+HTTP2_MAX_CONNECTIONS = 10
+DEFAULT_MAX_BACKOFF = 30.0
+
+# Connection-specific headers are not allowed in HTTP/2.
+HOP_BY_HOP_HEADERS = frozenset(
+    ("connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade")
+)
+
+
+@contextlib.contextmanager
+def client_span(request):
+    """
+    Run the block within a client span for the outgoing `request`.
+
+    The span context is propagated to the remote service via the request
+    headers.
+    """
+    with span(
+        f"HTTP {request.method}",
+        {"http.method": request.method, "http.url": request.url},
+        kind="client",
+    ):
+        inject_headers(request.headers)
+
+        yield
+
 
 class HTTPAdapterWithDefaultTimeout(rr.adapters.HTTPAdapter):
     """
@@ -33,31 +80,487 @@ class HTTPAdapterWithDefaultTimeout(rr.adapters.HTTPAdapter):
     ):
         """
         Calls the `HTTPAdapter.send()` making sure a timeout is set.
+
+        The request is sent within a client span (see `client_span`).
+        """
+        record_request(self.max_retries)
+
+        with client_span(request):
+            response = super().send(
+                request,
+                stream=stream,
+                timeout=self.timeout if timeout is None else timeout,
+                verify=verify,
+                cert=cert,
+                proxies=proxies,
+            )
+
+            set_attributes({"http.status_code": response.status_code})
+
+            return response
+
+
+class RetryBudget:
+    """
+    Allow retries up to a fraction of the recent requests.
+
+    Without a budget every call retries on its own: when an upstream service
+    fails, all the workers multiply the load on it by the number of retries,
+    right when it can bear it the least. With a budget the retries sent in the
+    last `window` seconds are at most `min_retries` plus `ratio` times the
+    requests sent in the same window; beyond that, calls fail straight away.
+
+    The budget also counts the requests, the retries, the retries rejected and
+    the seconds spent backing off, see `status()`.
+    """
+
+    def __init__(self, ratio=0.2, min_retries=10, window=10.0, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self.clock = clock
+        self.requests_total = 0
+        self.retries_total = 0
+        self.rejected_total = 0
+        self.backoff_seconds_total = 0.0
+        self._requests = collections.deque()
+        self._retries = collections.deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        for events in (self._requests, self._retries):
+            while events and now - events[0] >= self.window:
+                events.popleft()
+
+    def record_request(self):
+        "Record a request (not a retry) sent."
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            self._requests.append(now)
+            self.requests_total += 1
+
+    def spend(self):
+        "Return whether a retry is allowed, recording it if so."
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+
+            if len(self._retries) >= self.min_retries + self.ratio * len(
+                self._requests
+            ):
+                self.rejected_total += 1
+                return False
+
+            self._retries.append(now)
+            self.retries_total += 1
+            return True
+
+    def record_backoff(self, seconds):
+        "Record `seconds` spent waiting before a retry."
+        with self._lock:
+            self.backoff_seconds_total += seconds
+
+    def status(self):
+        "Return the recent and total retries spent."
+        with self._lock:
+            self._expire(self.clock())
+            return {
+                "recent_requests": len(self._requests),
+                "recent_retries": len(self._retries),
+                "requests": self.requests_total,
+                "retries": self.retries_total,
+                "rejected": self.rejected_total,
+                "backoff_seconds": round(self.backoff_seconds_total, 3),
+            }
+
+
+class Retry(urllib3.Retry):
+    """
+    `urllib3.Retry` with jittered backoff, a retry budget and tracing.
+
+    Delays follow the "decorrelated jitter" strategy: each one is random
+    between `backoff_factor` and three times the previous delay, capped to
+    `max_backoff`, so that calls failing together don't retry together.
+
+    A `Retry-After` header is honored, but if it asks to wait longer than
+    `max_backoff` the retries end there rather than blocking the worker.
+    Retries are charged to the `budget` (a `RetryBudget`), if any: when it is
+    exhausted the retries end as well. Each attempt is recorded as an event of
+    the current span.
+    """
+
+    def __init__(
+        self, *args, budget=None, max_backoff=DEFAULT_MAX_BACKOFF, delay=0.0, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.budget = budget
+        self.max_backoff = max_backoff
+        self.delay = delay
+
+    def new(self, **kw):
+        params = {
+            "budget": self.budget,
+            "max_backoff": self.max_backoff,
+            "delay": self.delay,
+        }
+        params.update(kw)
+
+        return super().new(**params)
+
+    def next_delay(self):
+        "Return a random delay for the retry following this one."
+        if not self.backoff_factor:
+            return 0.0
+
+        previous = max(self.delay, self.backoff_factor)
+        return min(self.max_backoff, random.uniform(self.backoff_factor, previous * 3))
+
+    def get_backoff_time(self):
+        return self.delay
+
+    def sleep(self, response=None):
+        start = time.monotonic()
+        super().sleep(response)
+        if self.budget is not None:
+            self.budget.record_backoff(time.monotonic() - start)
+
+    def increment(  # pylint: disable=too-many-arguments
+        self,
+        method=None,
+        url=None,
+        response=None,
+        error=None,
+        _pool=None,
+        _stacktrace=None,
+    ):
+        attributes = {"http.method": method or "", "http.url": url or ""}
+        if response is not None:
+            attributes["http.status_code"] = response.status
+        if error is not None:
+            attributes["error"] = repr(error)
+
+        add_event("retry", attributes)
+
+        retry = super().increment(
+            method=method,
+            url=url,
+            response=response,
+            error=error,
+            _pool=_pool,
+            _stacktrace=_stacktrace,
+        )
+
+        retry_after = None if response is None else self.get_retry_after(response)
+        if retry_after is not None and retry_after > self.max_backoff:
+            reason = f"Retry-After of {retry_after}s"
+        elif self.budget is not None and not self.budget.spend():
+            reason = "retry budget exhausted"
+        else:
+            retry.delay = self.next_delay()
+            return retry
+
+        add_event("retry.rejected", {"reason": reason})
+        raise urllib3.exceptions.MaxRetryError(
+            _pool, url, error or urllib3.exceptions.ResponseError(reason)
+        )
+
+
+def record_request(retries):
+    "Record a request in the budget of `retries`, if any."
+    budget = getattr(retries, "budget", None)
+    if budget is not None:
+        budget.record_request()
+
+
+class RetryPolicy:
+    """
+    How the calls to a provider are retried (see `Retry`).
+
+    Policies configured by the env-variables are shared by all the calls to the
+    same provider, and so is their budget, see `retry_policy()`.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        max_retries=5,
+        status_forcelist=(500, 502, 503, 504),
+        backoff_factor=2,
+        max_backoff=DEFAULT_MAX_BACKOFF,
+        budget=None,
+        allowed_methods=urllib3.Retry.DEFAULT_ALLOWED_METHODS,
+    ):
+        self.max_retries = max_retries
+        self.status_forcelist = status_forcelist
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.allowed_methods = allowed_methods
+
+    @classmethod
+    def from_settings(
+        cls, provider, allowed_methods=urllib3.Retry.DEFAULT_ALLOWED_METHODS
+    ):
         """
-        return super().send(
-            request,
-            stream=stream,
-            timeout=self.timeout if timeout is None else timeout,
-            verify=verify,
-            cert=cert,
-            proxies=proxies,
+        Create the retry policy of `provider` configured by the env-variables.
+
+        Only requests whose method is in `allowed_methods` are retried on error
+        responses, by default the idempotent ones: a provider whose `POST`
+        calls are idempotent too can add it.
+        """
+        prefix = provider.upper()
+        return cls(
+            allowed_methods=allowed_methods,
+            max_retries=env_int(f"{prefix}_MAX_RETRIES", 5),
+            backoff_factor=env_float(f"{prefix}_BACKOFF_FACTOR", 2.0),
+            max_backoff=env_float(f"{prefix}_MAX_BACKOFF", DEFAULT_MAX_BACKOFF),
+            budget=RetryBudget(
+                ratio=env_float(f"{prefix}_RETRY_BUDGET", 0.2),
+                min_retries=env_int(f"{prefix}_RETRY_BUDGET_MIN", 10),
+            ),
         )
 
+    def retry(self):
+        "Return the `Retry` object for a new call."
+        return Retry(
+            total=self.max_retries,
+            status_forcelist=self.status_forcelist,
+            backoff_factor=self.backoff_factor,
+            max_backoff=self.max_backoff,
+            budget=self.budget,
+            allowed_methods=self.allowed_methods,
+        )
+
+    def status(self):
+        "Return the retries spent, see `RetryBudget.status()`."
+        return {} if self.budget is None else self.budget.status()
+
+
+_RETRY_POLICIES = {}
+
+
+def retry_policy(provider, allowed_methods=urllib3.Retry.DEFAULT_ALLOWED_METHODS):
+    """
+    Return the retry policy shared by the calls to `provider`.
+
+    It's created on first call, see `RetryPolicy.from_settings()`.
+    """
+    try:
+        return _RETRY_POLICIES[provider]
+    except KeyError:
+        return _RETRY_POLICIES.setdefault(
+            provider, RetryPolicy.from_settings(provider, allowed_methods)
+        )
+
+
+def retry_status():
+    "Return the retries spent by each provider."
+    return {
+        provider: policy.status()
+        for provider, policy in sorted(_RETRY_POLICIES.items())
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def http2_client(pid):  # pylint: disable=unused-argument
+    """
+    Return the `httpx.Client` shared by the `HTTP2Adapter`s of the process `pid`.
+
+    Connections can't be shared with a forked child, hence the cache key.
+    """
+    import httpx  # pylint: disable=import-outside-toplevel
+
+    return httpx.Client(
+        http2=True, limits=httpx.Limits(max_connections=HTTP2_MAX_CONNECTIONS)
+    )
+
+
+class _RetryResponse:  # pylint: disable=too-few-public-methods
+    "The bits of a `urllib3` response read by `urllib3.Retry`."
+
+    def __init__(self, response):
+        self.status = response.status_code
+        self.headers = response.headers
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    @staticmethod
+    def get_redirect_location():
+        return False
+
+
+class HTTP2Adapter(rr.adapters.BaseAdapter):
+    """
+    Send requests over HTTP/2 using [httpx](https://www.python-httpx.org/).
+
+    All the adapters of a process share the same `httpx.Client` (see
+    `http2_client`), so concurrent requests to the same host are multiplexed
+    over a few connections rather than opening one connection each.
+
+    Timeouts and retries work as in `HTTPAdapterWithDefaultTimeout`: the same
+    default timeout is used, and the same `urllib3.Retry` object decides which
+    responses and errors to retry, how long to wait in between, and which
+    `requests` exception to raise when retries are exhausted. The httpx errors
+    that are not retried are raised as `requests` exceptions as well.
+
+    It requires the `http2` extra. Redirects are not followed by httpx but, as
+    usual, by the `requests` session. The per-request `verify`, `cert` and
+    `proxies` arguments are ignored: certificates are always verified.
+    """
+
+    default_timeout = HTTPAdapterWithDefaultTimeout.default_timeout
+
+    def __init__(self, max_retries=0, timeout=None, client=None):
+        super().__init__()
+        self.max_retries = (
+            max_retries
+            if isinstance(max_retries, urllib3.Retry)
+            else urllib3.Retry(max_retries, read=False)
+        )
+        self.timeout = self.default_timeout if timeout is None else timeout
+        self.client = client or http2_client(os.getpid())
+
+    def send(  # pylint: disable=too-many-arguments
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        """
+        Send the `request`, retrying it according to `max_retries`.
+        """
+        import httpx  # pylint: disable=import-outside-toplevel
+
+        timeout = self.timeout if timeout is None else timeout
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect, pool=connect)
+
+        headers = {
+            name: value
+            for name, value in request.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        }
+        retries = self.max_retries
+        record_request(retries)
+
+        with client_span(request):
+            while True:
+                try:
+                    response = self.client.request(
+                        request.method,
+                        request.url,
+                        headers=headers,
+                        content=request.body,
+                        timeout=timeout,
+                        follow_redirects=False,
+                    )
+                except httpx.TransportError as exc:
+                    retries = self._increment(retries, request, error=exc)
+                    retries.sleep()
+                    continue
+                except httpx.DecodingError as exc:
+                    raise rr.exceptions.ContentDecodingError(
+                        exc, request=request
+                    ) from exc
+                except httpx.InvalidURL as exc:
+                    raise rr.exceptions.InvalidURL(exc, request=request) from exc
+                except httpx.RequestError as exc:
+                    raise rr.RequestException(exc, request=request) from exc
+
+                has_retry_after = "Retry-After" in response.headers
+                if retries.is_retry(
+                    request.method, response.status_code, has_retry_after
+                ):
+                    try:
+                        retries = self._increment(
+                            retries, request, response=_RetryResponse(response)
+                        )
+                    except rr.exceptions.RetryError:
+                        if retries.raise_on_status:
+                            raise
+                    else:
+                        retries.sleep(_RetryResponse(response))
+                        continue
+
+                set_attributes({"http.status_code": response.status_code})
+
+                return self.build_response(request, response)
+
+    @staticmethod
+    def _increment(retries, request, response=None, error=None):
+        """
+        Return the next `retries`, or raise the matching `requests` exception.
+        """
+        import httpx  # pylint: disable=import-outside-toplevel
+
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            reason = urllib3.exceptions.ConnectTimeoutError(str(error))
+        elif isinstance(error, httpx.ReadTimeout):
+            reason = urllib3.exceptions.ReadTimeoutError(None, request.url, str(error))
+        elif error is not None:
+            reason = urllib3.exceptions.ProtocolError(str(error))
+        else:
+            reason = None
+
+        try:
+            return retries.increment(
+                request.method, request.url, response=response, error=reason
+            )
+        except urllib3.exceptions.HTTPError as exc:
+            # Either retries are exhausted, or the error is not to be retried.
+            if isinstance(error, httpx.ConnectTimeout):
+                raise rr.ConnectTimeout(exc, request=request) from error
+            if isinstance(error, httpx.ReadTimeout):
+                raise rr.ReadTimeout(exc, request=request) from error
+            if error is not None:
+                raise rr.ConnectionError(exc, request=request) from error
+            raise rr.exceptions.RetryError(exc, request=request) from None
+
+    def build_response(self, request, resp):
+        "Return the `requests.Response` for the httpx response `resp`."
+        response = rr.models.Response()
+        response.status_code = resp.status_code
+        response.headers = rr.structures.CaseInsensitiveDict(resp.headers)
+        response.encoding = rr.utils.get_encoding_from_headers(response.headers)
+        response.reason = resp.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = resp.elapsed
+        response._content = resp.content  # pylint: disable=protected-access
+
+        return response
+
+    def close(self):
+        "The shared client outlives the adapter: nothing to close."
+
 
 @contextlib.contextmanager
-def RetryingSession(  # pylint: disable=invalid-name
-    max_retries=5, status_forcelist=(500, 502, 503, 504), backoff_factor=2
+def RetryingSession(  # pylint: disable=invalid-name,too-many-arguments
+    max_retries=5,
+    status_forcelist=(500, 502, 503, 504),
+    backoff_factor=2,
+    http2=None,
+    policy=None,
 ):
     """
     HTTP Session that retries on specific response status codes.
+
+    Retries follow the `policy` (a `RetryPolicy`), if given, otherwise a policy
+    without budget built from the other arguments.
+
+    Requests are sent over HTTP/2 (see `HTTP2Adapter`) if `http2` is true, or
+    if it's `None` and the `POKEPI_HTTP2` setting is true.
     """
 
-    retry_strategy = urllib3.Retry(
-        total=max_retries,
-        status_forcelist=status_forcelist,
-        backoff_factor=backoff_factor,
-    )
-    adapter = HTTPAdapterWithDefaultTimeout(max_retries=retry_strategy)
+    if policy is None:
+        policy = RetryPolicy(max_retries, status_forcelist, backoff_factor)
+
+    retry_strategy = policy.retry()
+
+    if env_bool("HTTP2") if http2 is None else http2:
+        adapter = HTTP2Adapter(max_retries=retry_strategy)
+    else:
+        adapter = HTTPAdapterWithDefaultTimeout(max_retries=retry_strategy)
 
     session = rr.Session()
     session.mount("https://", adapter)
@@ -86,6 +589,7 @@ class ValidationError(Exception):
     "Invalid data structure"
 
 
+@traced("validate")
 def validate(payload, validation_schema):
     """
     Validate the PokeAPI result against the expected response schema.
@@ -2,7 +2,9 @@
 Retrieve Pokemon data from pokeapi.co
 """
 
+import functools
 import logging
+import sys
 
 import requests as rr
 import schema
@@ -11,14 +13,37 @@ from pokepi.providers.common import (
     ProviderError,
     ResourceNotFound,
     RetryingSession,
+    retry_policy,
     validate,
 )
+from pokepi.tracing import traced
 
 
 log = logging.getLogger(__name__)
 
 URL = "https://pokeapi.co/api/v2/pokemon-species/{name}"
+LIST_URL = "https://pokeapi.co/api/v2/pokemon-species?limit={limit}"
+LIST_LIMIT = 100000
 LANGUAGE = "en"
+# The language names used by PokeAPI, see https://pokeapi.co/api/v2/language/
+LANGUAGES = (
+    "cs",
+    "de",
+    "en",
+    "es",
+    "fr",
+    "it",
+    "ja",
+    "ja-Hrkt",
+    "ko",
+    "pt-BR",
+    "roomaji",
+    "zh-Hans",
+    "zh-Hant",
+)
+_LANGUAGES_BY_TAG = {language.lower(): language for language in LANGUAGES}
+SPECIES_CACHE_SIZE = 2048
+
 
 VALIDATION_SCHEMA = schema.Schema(
     {
@@ -32,7 +57,17 @@ VALIDATION_SCHEMA = schema.Schema(
     ignore_extra_keys=True,
 )
 
+LIST_VALIDATION_SCHEMA = schema.Schema(
+    {"results": [{"name": str}]}, ignore_extra_keys=True
+)
+
+
+def preload():
+    "Set up the provider's shared state, see `pokepi.providers.preload`."
+    retry_policy("pokeapi")
 
+
+@traced("pokeapi.get_pokemon_species")
 def get_pokemon_species(name):
     """
     Call the remote provider pokeapi.co and return the result.
@@ -42,7 +77,7 @@ def get_pokemon_species(name):
     url = URL.format(name=name)
 
     try:
-        with RetryingSession() as http:
+        with RetryingSession(policy=retry_policy("pokeapi")) as http:
             resp = http.get(url)
 
         resp.raise_for_status()
@@ -69,20 +104,26 @@ def get_pokemon_species(name):
         return resp.json()
 
 
-def extract(payload):
+@traced("pokeapi.list_pokemon_species")
+def list_pokemon_species():
     """
-    Extract a brief description for the returned Pokemon Species.
+    Return the names of all the Pokemon species known to pokeapi.co.
 
-    The API returns several descriptions in different languages, and for a given
-    language more than one description can be available. Since we want to
-    translate this description into Shakespeare's style only descriptions
-    written in English are selected.
+    In case of any I/O error a `ProviderError` is raised, if the response does
+    not conform to the expected JSON schema a `ValidationError` is raised.
     """
-    return [
-        flavor["flavor_text"]
-        for flavor in payload["flavor_text_entries"]
-        if flavor["language"]["name"] == LANGUAGE
-    ]
+    try:
+        with RetryingSession(policy=retry_policy("pokeapi")) as http:
+            resp = http.get(LIST_URL.format(limit=LIST_LIMIT))
+
+        resp.raise_for_status()
+    except rr.RequestException as exc:
+        log.exception("PokeAPI failed listing species: %s", exc)
+        raise ProviderError("Unexpected error from PokeAPI") from None
+
+    validated = validate(resp.json(), LIST_VALIDATION_SCHEMA)
+
+    return [species["name"] for species in validated["results"]]
 
 
 def sanitize(text):
@@ -112,30 +153,96 @@ def sanitize(text):
     return spaces_normilized
 
 
-def pokeapi_processor(name):
+def index_descriptions(payload):
     """
-    Return Pokemon's description when given a `name`.
+    Return the longest sanitized description for each language.
 
-    PokeAPI returns many descriptions for a given `name`, to make our API
+    PokeAPI returns many descriptions for a given species, to make our API
     service really RESTful the result of this processor must be stable. One way
     to get it stable would have been to concatenate all the descriptions, but
     I'm not sure about any text length limit in the following translation step.
-    So I decided to pick the longest description which should be fine.
+    So I decided to pick the longest description which should be fine. Among
+    descriptions of the same length the first one is picked.
+
+    The whole payload is scanned once, and the result maps each language name
+    (as returned by PokeAPI, e.g. `en`, `ja-Hrkt`) to its description. Language
+    names are interned, so the cached indexes of all the species share them.
+    """
+    index = {}
+
+    for flavor in payload["flavor_text_entries"]:
+        language = sys.intern(flavor["language"]["name"])
+        description = sanitize(flavor["flavor_text"])
+
+        if language not in index or len(description) > len(index[language]):
+            index[language] = description
+
+    return index
+
 
-    If the Pokemon does not exist a `ResourceNotFound` exception is raised. If
-    the response does not conform to the expected JSON schema a
-    `ValidationError` is raised. In case of any I/O error a generic
-    `ProviderError` is raised. Unexcepted error conditions can raise any child
-    of `Exception`.
+@functools.lru_cache(maxsize=SPECIES_CACHE_SIZE)
+def species_descriptions(name):
+    """
+    Return the descriptions of the Pokemon `name` indexed by language.
+
+    The index is built once per fetched species and cached, so serving any
+    language after the first fetch is a dictionary lookup. The returned
+    dictionary is shared and must not be modified. Failures are not cached.
     """
     payload = get_pokemon_species(name)
 
     validated = validate(payload, VALIDATION_SCHEMA)
 
-    descriptions = extract(validated)
+    return index_descriptions(validated)
+
+
+def resolve_language(language):
+    """
+    Return the PokeAPI name of the requested `language`, or `None` if unknown.
+
+    Language tags are matched case-insensitively and, when there is no exact
+    match, the primary language subtag is tried, so that e.g. `en-US` resolves
+    to `en`. Resolving languages needs no upstream call, and bounds them to the
+    few known to PokeAPI.
+    """
+    tag = language.strip().lower()
+
+    return _LANGUAGES_BY_TAG.get(tag) or _LANGUAGES_BY_TAG.get(tag.split("-", 1)[0])
+
+
+def described_language(name, languages):
+    """
+    Return the first of `languages` the Pokemon `name` has a description in.
+
+    The `languages` must be resolved (see `resolve_language`). If the Pokemon
+    has a description in none of them the default language is returned, so
+    that clients get a description anyway.
+    """
+    descriptions = species_descriptions(name)
+
+    return next(
+        (language for language in languages if language in descriptions), LANGUAGE
+    )
+
+
+def pokeapi_processor(name, language=LANGUAGE):
+    """
+    Return Pokemon's description, in the given `language`, when given a `name`.
+
+    The language is resolved first (see `resolve_language`). If the language is
+    unknown, the Pokemon does not exist, or it has no description in the
+    language, a `ResourceNotFound` exception is raised. If the response does
+    not conform to the expected JSON schema a `ValidationError` is raised. In
+    case of any I/O error a generic `ProviderError` is raised. Unexcepted error
+    conditions can raise any child of `Exception`.
+    """
+    resolved = resolve_language(language)
+    if resolved is None:
+        raise ResourceNotFound(f"Unknown language '{language}'.")
 
-    sanitized = [sanitize(description) for description in descriptions]
+    description = species_descriptions(name).get(resolved)
 
-    longest_description = sorted(sanitized, key=len, reverse=True)[0]
+    if description is None:
+        raise ResourceNotFound(f"No '{resolved}' description for Pokemon '{name}'.")
 
-    return longest_description
+    return description
@@ -6,13 +6,24 @@ import logging
 
 import requests as rr
 import schema
-
-from pokepi.providers.common import ProviderError, RetryingSession, validate
+import urllib3
+
+from pokepi.providers.common import (
+    ProviderError,
+    RetryingSession,
+    RetryPolicy,
+    retry_policy,
+    validate,
+)
+from pokepi.tracing import traced
 
 
 log = logging.getLogger(__name__)
 
 URL = "https://api.funtranslations.com/translate/shakespeare.json"
+# Translating is idempotent, so the translation POST requests can be retried.
+RETRY_METHODS = urllib3.Retry.DEFAULT_ALLOWED_METHODS | {"POST"}
+NO_RETRY = RetryPolicy(max_retries=0)
 
 
 VALIDATION_SCHEMA = schema.Schema(
@@ -23,12 +34,22 @@ VALIDATION_SCHEMA = schema.Schema(
 )
 
 
-def get_translation(text):
+def preload():
+    "Set up the provider's shared state, see `pokepi.providers.preload`."
+    retry_policy("shakespeare", RETRY_METHODS)
+
+
+@traced("shakespeare.get_translation")
+def get_translation(text, retry=True):
     """
     Get translation from api.funtranslation.com
+
+    Failed requests are retried, unless `retry` is false.
     """
+    policy = retry_policy("shakespeare", RETRY_METHODS) if retry else NO_RETRY
+
     try:
-        with RetryingSession() as http:
+        with RetryingSession(policy=policy) as http:
             resp = http.post(URL, data={"text": text})
 
         resp.raise_for_status()
@@ -47,15 +68,17 @@ def extract(payload):
     return payload["contents"]["translated"]
 
 
-def shakespeare_processor(text):
+def shakespeare_processor(text, retry=True):
     """
     Return Shakespeare API translation of the given `text`.
 
-    If the Shakespeare API fails a `ProviderError` is raised. If the response
-    does not conform to the expected JSON schema a `ValidationError` is raised.
-    Unexpected error conditions can raise any child of `Exception`.
+    Failed requests are retried, unless `retry` is false (e.g. when each call
+    has to be accounted for against the API rate limit). If the Shakespeare API
+    fails a `ProviderError` is raised. If the response does not conform to the
+    expected JSON schema a `ValidationError` is raised. Unexpected error
+    conditions can raise any child of `Exception`.
     """
-    payload = get_translation(text)
+    payload = get_translation(text, retry)
 
     validated = validate(payload, VALIDATION_SCHEMA)
 
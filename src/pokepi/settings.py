@@ -0,0 +1,52 @@
+"""
+Read the application's settings from the environment.
+
+All the settings are read from env-variables prefixed with `POKEPI_`, values
+are parsed on access so that tests (and the gunicorn master) can change them
+before the application is configured.
+"""
+
+import os
+
+
+PREFIX = "POKEPI_"
+
+TRUTHY = frozenset(("1", "true", "yes", "on"))
+FALSY = frozenset(("0", "false", "no", "off", ""))
+
+
+def env_str(name, default=None):
+    "Return the setting `name` as a string or `default` if not set."
+    return os.environ.get(PREFIX + name, default)
+
+
+def env_bool(name, default=False):
+    """
+    Return the setting `name` as a boolean or `default` if not set.
+
+    Accepted values are (case insensitive) `1`, `true`, `yes`, `on` and `0`,
+    `false`, `no`, `off`. Any other value raises a `ValueError`.
+    """
+    value = env_str(name)
+    if value is None:
+        return default
+
+    value = value.strip().lower()
+    if value in TRUTHY:
+        return True
+    if value in FALSY:
+        return False
+
+    raise ValueError(f"Invalid boolean for {PREFIX}{name}: {value!r}")
+
+
+def env_int(name, default=None):
+    "Return the setting `name` as an integer or `default` if not set."
+    value = env_str(name)
+    return default if value is None else int(value)
+
+
+def env_float(name, default=None):
+    "Return the setting `name` as a float or `default` if not set."
+    value = env_str(name)
+    return default if value is None else float(value)
@@ -0,0 +1,114 @@
+"""
+Compact in-memory store of texts.
+
+Holding many short texts as Python objects costs well beyond the text itself:
+every `str` carries a ~50 bytes header, every `(name, language)` key tuple
+~60 more, besides the dict entries. A `TextStore` instead keeps:
+
+- the texts, UTF-8 encoded, back to back in a single `bytearray` (the arena);
+- for each language a dict mapping the interned name to the position of its
+  text in the arena, packed in a single int as `offset << 32 | length`.
+
+Names are interned, so the same name stored in several languages (or already
+held elsewhere, e.g. by the species list) is a single object.
+
+Texts can also be compressed with raw zlib streams sharing a preset dictionary
+sampled from the texts themselves (see `sample_zdict()`): short texts barely
+compress on their own, but they share most of their words. Compression trades
+some CPU on every read for memory, and pays off for large sets of entries that
+are rarely read, e.g. a full pre-translated index of which only the popular
+species are actually requested.
+"""
+
+import sys
+import threading
+import zlib
+
+
+LENGTH_BITS = 32
+LENGTH_MASK = (1 << LENGTH_BITS) - 1
+ZDICT_SIZE = 32 * 1024  # the deflate window, longer dictionaries are truncated
+WBITS = -15  # raw deflate streams: no header and checksum per text
+
+
+def sample_zdict(texts, size=ZDICT_SIZE):
+    """
+    Return a zlib preset dictionary of at most `size` bytes sampled from `texts`.
+
+    Texts are taken in order until the dictionary is full.
+    """
+    sample = bytearray()
+    for text in texts:
+        if len(sample) >= size:
+            break
+        sample += text.encode("utf-8")
+
+    return bytes(sample[:size])
+
+
+class TextStore:
+    """
+    Map `(name, language)` pairs to texts, stored compactly.
+
+    Writes are serialized by a lock, while reads are lock-free: the arena only
+    grows, and the position of a text is published only after the text has
+    been appended. Replacing a text leaves the old one in the arena, which is
+    fine for caches whose entries are written once.
+    """
+
+    def __init__(self, compress=False, zdict=b""):
+        self.compress = compress
+        self.zdict = zdict
+        self._arena = bytearray()
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def _encode(self, text):
+        data = text.encode("utf-8")
+        if not self.compress:
+            return data
+
+        compressor = zlib.compressobj(9, zlib.DEFLATED, WBITS, zdict=self.zdict)
+        return compressor.compress(data) + compressor.flush()
+
+    def _decode(self, data):
+        if self.compress:
+            decompressor = zlib.decompressobj(WBITS, zdict=self.zdict)
+            data = decompressor.decompress(data) + decompressor.flush()
+
+        return data.decode("utf-8")
+
+    def get(self, name, language):
+        "Return the text for `name` in `language`, or `None` if not stored."
+        position = self._positions.get(language, {}).get(name)
+        if position is None:
+            return None
+
+        offset = position >> LENGTH_BITS
+        return self._decode(
+            bytes(self._arena[offset : offset + (position & LENGTH_MASK)])
+        )
+
+    def put(self, name, language, text):
+        "Store the `text` for `name` in `language`."
+        data = self._encode(text)
+
+        with self._lock:
+            offset = len(self._arena)
+            self._arena += data
+
+            positions = self._positions.setdefault(sys.intern(language), {})
+            positions[sys.intern(name)] = offset << LENGTH_BITS | len(data)
+
+    @property
+    def nbytes(self):
+        "Size of the arena, in bytes."
+        return len(self._arena)
+
+    def __len__(self):
+        return sum(len(positions) for positions in self._positions.values())
+
+    def __contains__(self, key):
+        "Whether `(name, language)` is stored."
+        name, language = key
+        return name in self._positions.get(language, {})
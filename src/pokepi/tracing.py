@@ -0,0 +1,221 @@
+"""
+Distributed tracing.
+
+Spans are created through the [OpenTelemetry](https://opentelemetry.io/) API,
+which is an optional dependency (install the `tracing` extra). The API is only
+imported once tracing is enabled (see `enable_tracing()`, called by
+`configure_tracing()` when an exporter is configured): until then every helper
+in this module is a no-op, and importing it costs nothing.
+
+Each request served by the application gets a server span (continuing the
+caller's trace if a `traceparent` header is sent), providers' calls and
+outgoing HTTP requests get child spans, and the trace context is propagated to
+the upstream services via HTTP headers.
+
+Settings:
+
+- `POKEPI_TRACING_EXPORTER` (default empty, i.e. disabled):
+    - `file`: append spans, one JSON object per line, to `POKEPI_TRACING_FILE`
+      (default `pokepi-spans.jsonl`), see `benchmarks/span_breakdown.py` to
+      analyse them offline;
+    - `console`: write spans to `stdout`;
+    - `otlp`: send spans to an OTLP collector over HTTP (requires the
+      `opentelemetry-exporter-otlp-proto-http` package), the collector is
+      configured by the standard `OTEL_EXPORTER_OTLP_*` env-variables and
+      defaults to a local one.
+"""
+
+import contextlib
+import functools
+
+from pokepi.settings import env_str
+
+
+# The OpenTelemetry API modules, set by `enable_tracing()`.
+propagate = trace = None  # pylint: disable=invalid-name
+
+SERVICE_NAME = "pokepi"
+TRACER_NAME = "pokepi"
+
+
+class TracingError(Exception):
+    "Invalid tracing configuration."
+
+
+def enable_tracing():
+    """
+    Import the OpenTelemetry API, so that the helpers start recording spans.
+
+    Spans go to the tracer provider installed globally. Return whether the API
+    is installed.
+    """
+    global propagate, trace  # pylint: disable=global-statement,invalid-name
+
+    if trace is None:
+        try:
+            # pylint: disable=import-outside-toplevel
+            from opentelemetry import propagate, trace
+        except ImportError:
+            return False
+
+    return True
+
+
+def _exporter(name):
+    # pylint: disable=import-outside-toplevel
+    from opentelemetry.sdk.trace import export
+
+    if name == "file":
+        out = open(  # pylint: disable=consider-using-with
+            env_str("TRACING_FILE", "pokepi-spans.jsonl"),
+            "a",
+            buffering=1,
+            encoding="utf-8",
+        )
+        return export.ConsoleSpanExporter(
+            out=out, formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+
+    if name == "console":
+        return export.ConsoleSpanExporter(service_name=SERVICE_NAME)
+
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        return OTLPSpanExporter()
+
+    raise TracingError(f"Unknown tracing exporter: {name!r}")
+
+
+def configure_tracing():
+    """
+    Set up the span exporter configured by `POKEPI_TRACING_EXPORTER`.
+
+    Spans are exported in batches by a background thread. Return the tracer
+    provider, or `None` if tracing is disabled.
+    """
+    name = env_str("TRACING_EXPORTER", "")
+    if not name:
+        return None
+
+    if not enable_tracing():
+        raise TracingError("Tracing requires the 'tracing' extra to be installed")
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as exc:
+        raise TracingError(
+            "Tracing requires the 'tracing' extra to be installed"
+        ) from exc
+
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(_exporter(name)))
+
+    trace.set_tracer_provider(provider)
+
+    return provider
+
+
+@contextlib.contextmanager
+def span(name, attributes=None, kind=None, context=None):
+    """
+    Run the block within a new span, child of the current one.
+
+    `kind` is the name of an OpenTelemetry `SpanKind` (e.g. `"client"`). Yield
+    the span, or `None` if tracing is not enabled.
+    """
+    if trace is None:
+        yield None
+        return
+
+    with trace.get_tracer(TRACER_NAME).start_as_current_span(
+        name,
+        context=context,
+        kind=trace.SpanKind[(kind or "internal").upper()],
+        attributes=attributes,
+    ) as current:
+        yield current
+
+
+def traced(name):
+    "Decorate a function to run it within a span called `name`."
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def add_event(name, attributes=None):
+    "Add an event to the current span."
+    if trace is not None:
+        trace.get_current_span().add_event(name, attributes=attributes)
+
+
+def set_attributes(attributes):
+    "Set attributes on the current span."
+    if trace is not None:
+        trace.get_current_span().set_attributes(attributes)
+
+
+def inject_headers(headers):
+    "Add the current trace context to the outgoing HTTP `headers`."
+    if propagate is not None:
+        propagate.inject(headers)
+
+
+class _EnvironGetter:
+    "Read HTTP headers from a WSGI environ for the OpenTelemetry propagators."
+
+    @staticmethod
+    def get(environ, key):
+        value = environ.get("HTTP_" + key.upper().replace("-", "_"))
+        return None if value is None else [value]
+
+    @staticmethod
+    def keys(environ):
+        return [
+            key[5:].lower().replace("_", "-")
+            for key in environ
+            if key.startswith("HTTP_")
+        ]
+
+
+class TracingMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    WSGI middleware running each request within a server span.
+
+    The trace context sent by the caller, if any, is used as parent.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if propagate is None:
+            return self.wsgi_app(environ, start_response)
+
+        method = environ.get("REQUEST_METHOD", "GET")
+
+        with span(
+            f"HTTP {method}",
+            {"http.method": method, "http.target": environ.get("PATH_INFO", "")},
+            kind="server",
+            context=propagate.extract(environ, getter=_EnvironGetter()),
+        ) as current:
+
+            def traced_start_response(status, headers, exc_info=None):
+                current.set_attribute("http.status_code", int(status.split(" ", 1)[0]))
+                return start_response(status, headers, exc_info)
+
+            return self.wsgi_app(environ, traced_start_response)
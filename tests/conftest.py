@@ -0,0 +1,56 @@
+# pylint: disable=missing-docstring
+
+import pytest
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from pokepi.tracing import enable_tracing
+
+
+@pytest.fixture(name="span_exporter", scope="session")
+def fixture_span_exporter():
+    "Install (once) a tracer provider keeping the finished spans in memory."
+    exporter = InMemorySpanExporter()
+
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    enable_tracing()
+
+    return exporter
+
+
+@pytest.fixture(name="spans")
+def fixture_spans(span_exporter):
+    "Return the list of the spans finished during the test."
+    span_exporter.clear()
+
+    class Spans:
+        @staticmethod
+        def names():
+            return [span.name for span in span_exporter.get_finished_spans()]
+
+        @staticmethod
+        def get(name):
+            return next(
+                span for span in span_exporter.get_finished_spans() if span.name == name
+            )
+
+    return Spans
+
+
+@pytest.fixture(name="clock")
+def fixture_clock():
+    "Return a fake clock, whose time is set via its `now` attribute."
+
+    class FakeClock:
+        def __init__(self):
+            self.now = 0.0
+
+        def __call__(self):
+            return self.now
+
+    return FakeClock()
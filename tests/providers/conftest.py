@@ -1,8 +1,16 @@
 # pylint: disable=no-self-use,missing-docstring
 
+import socketserver
+import threading
+
+import h2.config
+import h2.connection
+import h2.events
 import pytest
 import responses
 
+from pokepi.providers.pokeapi import species_descriptions
+
 
 @pytest.fixture(name="retrying_response")
 def fixture_retrying_response():
@@ -11,3 +19,85 @@ def fixture_retrying_response():
         target="pokepi.providers.common.HTTPAdapterWithDefaultTimeout.send"
     ) as m_resp:
         yield m_resp
+
+
+@pytest.fixture(autouse=True)
+def clear_species_cache():
+    "Start every test with an empty species cache."
+    species_descriptions.cache_clear()
+
+
+class H2Server:
+    """
+    HTTP/2 server (clear text, prior knowledge) answering with canned responses.
+
+    Each request gets the next of the `responses` (`(status, headers, body)`
+    tuples), the last one is repeated. Requests are logged as `(method, path)`.
+    """
+
+    def __init__(self):
+        self.responses = [(200, {}, b"ok")]
+        self.log = []
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                conn = h2.connection.H2Connection(
+                    h2.config.H2Configuration(client_side=False)
+                )
+                conn.initiate_connection()
+                self.request.sendall(conn.data_to_send())
+
+                while True:
+                    data = self.request.recv(65535)
+                    if not data:
+                        return
+
+                    for event in conn.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            server.respond(conn, event)
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            return
+
+                    self.request.sendall(conn.data_to_send())
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+
+    def respond(self, conn, event):
+        headers = dict(event.headers)
+        with self._lock:
+            self.log.append((headers[b":method"], headers[b":path"]))
+            status, extra_headers, body = self.responses[
+                min(len(self.log), len(self.responses)) - 1
+            ]
+
+        conn.send_headers(
+            event.stream_id,
+            [(":status", str(status)), ("content-length", str(len(body)))]
+            + list(extra_headers.items()),
+        )
+        conn.send_data(event.stream_id, body, end_stream=True)
+
+    def url_for(self, path):
+        return f"http://127.0.0.1:{self._server.server_address[1]}{path}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture(name="h2server")
+def fixture_h2server():
+    "Run a `H2Server` for the test."
+    server = H2Server()
+    server.start()
+
+    yield server
+
+    server.stop()
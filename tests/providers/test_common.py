@@ -1,9 +1,24 @@
 # pylint: disable=no-self-use,missing-docstring
 
+import threading
+import time
+
+import httpx
 import pytest
 import requests as rr
 
-from pokepi.providers.common import RetryingSession
+from werkzeug import Response
+
+from pokepi.providers.common import (
+    HTTP2Adapter,
+    HTTPAdapterWithDefaultTimeout,
+    Retry,
+    RetryBudget,
+    RetryingSession,
+    RetryPolicy,
+    retry_policy,
+    retry_status,
+)
 
 
 class TestRetryingSession:
@@ -11,7 +26,7 @@ class TestRetryingSession:
         httpserver.expect_request("/broken-api").respond_with_data(status=500)
 
         with pytest.raises(rr.exceptions.RetryError):
-            with RetryingSession(max_retries=1) as http:
+            with RetryingSession(max_retries=1, backoff_factor=0) as http:
                 http.get(httpserver.url_for("/broken-api"))
 
     def test_eventually_succeed(self, httpserver):
@@ -22,7 +37,7 @@ class TestRetryingSession:
             data, status=200
         )
 
-        with RetryingSession(max_retries=1) as http:
+        with RetryingSession(max_retries=1, backoff_factor=0) as http:
             resp = http.get(httpserver.url_for("/flaky-api"))
 
             assert resp.status_code == 200
@@ -38,3 +53,323 @@ class TestRetryingSession:
 
             assert resp.status_code == 404
             assert resp.json() == data
+
+
+class TestRetryBudget:
+    def test_min_retries(self):
+        budget = RetryBudget(ratio=0, min_retries=2)
+
+        assert [budget.spend() for _ in range(3)] == [True, True, False]
+
+    def test_ratio(self):
+        budget = RetryBudget(ratio=0.5, min_retries=0)
+        for _ in range(4):
+            budget.record_request()
+
+        assert [budget.spend() for _ in range(3)] == [True, True, False]
+
+    def test_window(self, clock):
+        budget = RetryBudget(ratio=0, min_retries=1, window=10, clock=clock)
+
+        assert budget.spend()
+        assert not budget.spend()
+
+        clock.now = 10
+
+        assert budget.spend()
+
+    def test_status(self, clock):
+        budget = RetryBudget(ratio=0, min_retries=1, window=10, clock=clock)
+        budget.record_request()
+        budget.spend()
+        budget.spend()
+        budget.record_backoff(0.25)
+        clock.now = 10
+
+        assert budget.status() == {
+            "recent_requests": 0,
+            "recent_retries": 0,
+            "requests": 1,
+            "retries": 1,
+            "rejected": 1,
+            "backoff_seconds": 0.25,
+        }
+
+
+class TestRetry:
+    def test_decorrelated_jitter(self):
+        retry = Retry(10, backoff_factor=1, max_backoff=5, status_forcelist=(503,))
+        delays = []
+
+        for _ in range(10):
+            previous = max(retry.delay, 1)
+            retry = retry.increment("GET", "/api", error=ConnectionResetError())
+            delays.append(retry.get_backoff_time())
+
+            assert 1 <= retry.delay <= min(5, previous * 3)
+
+        assert len(set(delays)) > 1
+
+    def test_no_backoff(self):
+        retry = Retry(1, backoff_factor=0).increment("GET", "/api", error=OSError())
+
+        assert retry.get_backoff_time() == 0
+
+    def test_state_carried(self):
+        budget = RetryBudget()
+        retry = Retry(2, budget=budget, max_backoff=5)
+
+        retry = retry.increment("GET", "/api", error=OSError())
+
+        assert retry.budget is budget
+        assert retry.max_backoff == 5
+
+    def test_budget_exhausted(self, httpserver):
+        httpserver.expect_request("/broken-api").respond_with_data(status=503)
+        policy = RetryPolicy(
+            backoff_factor=0, budget=RetryBudget(ratio=0, min_retries=1)
+        )
+
+        with pytest.raises(rr.exceptions.RetryError):
+            with RetryingSession(policy=policy) as http:
+                http.get(httpserver.url_for("/broken-api"))
+
+        assert len(httpserver.log) == 2
+        assert policy.status()["requests"] == 1
+        assert policy.status()["rejected"] == 1
+
+    @pytest.mark.parametrize("http2", [False, True])
+    def test_retry_after(self, httpserver, http2):
+        httpserver.expect_ordered_request("/busy-api").respond_with_data(
+            status=503, headers={"Retry-After": "1"}
+        )
+        httpserver.expect_ordered_request("/busy-api").respond_with_data("ok")
+
+        start = time.monotonic()
+        with RetryingSession(max_retries=1, backoff_factor=0, http2=http2) as http:
+            assert http.get(httpserver.url_for("/busy-api")).text == "ok"
+
+        assert time.monotonic() - start >= 1
+
+    @pytest.mark.parametrize("http2", [False, True])
+    def test_retry_after_too_long(self, httpserver, http2):
+        httpserver.expect_request("/busy-api").respond_with_data(
+            status=503, headers={"Retry-After": "3600"}
+        )
+
+        with pytest.raises(rr.exceptions.RetryError):
+            with RetryingSession(max_retries=1, http2=http2) as http:
+                http.get(httpserver.url_for("/busy-api"))
+
+        assert len(httpserver.log) == 1
+
+
+class TestRetryPolicy:
+    def test_from_settings(self, monkeypatch):
+        monkeypatch.setenv("POKEPI_TEST_MAX_RETRIES", "2")
+        monkeypatch.setenv("POKEPI_TEST_BACKOFF_FACTOR", "0.5")
+        monkeypatch.setenv("POKEPI_TEST_MAX_BACKOFF", "4")
+        monkeypatch.setenv("POKEPI_TEST_RETRY_BUDGET", "0.1")
+        monkeypatch.setenv("POKEPI_TEST_RETRY_BUDGET_MIN", "3")
+
+        retry = RetryPolicy.from_settings("test").retry()
+
+        assert (retry.total, retry.backoff_factor, retry.max_backoff) == (2, 0.5, 4)
+        assert (retry.budget.ratio, retry.budget.min_retries) == (0.1, 3)
+
+    def test_allowed_methods(self):
+        retry = RetryPolicy().retry()
+        post_retry = RetryPolicy(allowed_methods=frozenset({"POST"})).retry()
+
+        assert not retry.is_retry("POST", 503)
+        assert post_retry.is_retry("POST", 503)
+        assert post_retry.is_retry("POST", 429, True)
+
+    def test_shared(self):
+        assert retry_policy("pokeapi") is retry_policy("pokeapi")
+        assert retry_policy("pokeapi") is not retry_policy("shakespeare")
+        assert {"pokeapi", "shakespeare"} <= set(retry_status())
+
+
+class TestTracing:
+    def test_client_span(self, httpserver, spans):
+        httpserver.expect_request("/api").respond_with_data("ok")
+
+        with RetryingSession(max_retries=1) as http:
+            resp = http.get(httpserver.url_for("/api"))
+
+        client = spans.get("HTTP GET")
+
+        assert client.attributes["http.status_code"] == 200
+        assert f"-{client.context.span_id:016x}-" in resp.request.headers["traceparent"]
+
+    def test_retry_events(self, httpserver, spans):
+        httpserver.expect_ordered_request("/flaky-api").respond_with_data(status=503)
+        httpserver.expect_ordered_request("/flaky-api").respond_with_data("ok")
+
+        with RetryingSession(max_retries=1, backoff_factor=0) as http:
+            http.get(httpserver.url_for("/flaky-api"))
+
+        (event,) = spans.get("HTTP GET").events
+
+        assert event.name == "retry"
+        assert event.attributes["http.status_code"] == 503
+
+
+class TestHTTP2Adapter:
+    @pytest.fixture(name="http")
+    def fixture_http(self):
+        session = rr.Session()
+        retries = Retry(1, backoff_factor=0, status_forcelist=(500, 503))
+        session.mount("http://", HTTP2Adapter(max_retries=retries))
+
+        with session:
+            yield session
+
+    def test_ok(self, httpserver, http):
+        data = {"result": "ok"}
+        httpserver.expect_request("/api", method="POST", data="a=1").respond_with_json(
+            data
+        )
+
+        resp = http.post(httpserver.url_for("/api"), data={"a": 1})
+
+        assert resp.status_code == 200
+        assert resp.reason == "OK"
+        assert resp.json() == data
+
+    def test_eventually_succeed(self, httpserver, http):
+        httpserver.expect_ordered_request("/flaky-api").respond_with_data(status=503)
+        httpserver.expect_ordered_request("/flaky-api").respond_with_data("ok")
+
+        resp = http.get(httpserver.url_for("/flaky-api"))
+
+        assert resp.status_code == 200
+        assert resp.text == "ok"
+
+    def test_always_fails(self, httpserver, http):
+        httpserver.expect_request("/broken-api").respond_with_data(status=500)
+
+        with pytest.raises(rr.exceptions.RetryError):
+            http.get(httpserver.url_for("/broken-api"))
+
+    def test_dont_raise_on_status(self, httpserver):
+        httpserver.expect_request("/broken-api").respond_with_data(status=500)
+        adapter = HTTP2Adapter(
+            max_retries=Retry(
+                1, backoff_factor=0, status_forcelist=(500,), raise_on_status=False
+            )
+        )
+
+        with rr.Session() as http:
+            http.mount("http://", adapter)
+            resp = http.get(httpserver.url_for("/broken-api"))
+
+        assert resp.status_code == 500
+        assert len(httpserver.log) == 2
+
+    def test_dont_retry(self, httpserver, http):
+        httpserver.expect_request("/not-found-api").respond_with_data(status=404)
+
+        resp = http.get(httpserver.url_for("/not-found-api"))
+
+        assert resp.status_code == 404
+        assert len(httpserver.log) == 1
+
+    def test_connection_error(self, http):
+        with pytest.raises(rr.ConnectionError):
+            http.get("http://127.0.0.1:1/unreachable")
+
+    def test_read_timeout(self, httpserver):
+        release = threading.Event()
+        httpserver.expect_request("/slow-api").respond_with_handler(
+            lambda request: release.wait(5) and Response("ok")
+        )
+
+        try:
+            with rr.Session() as http:
+                http.mount("http://", HTTP2Adapter(timeout=(1, 0.1)))
+
+                with pytest.raises(rr.ReadTimeout):
+                    http.get(httpserver.url_for("/slow-api"))
+        finally:
+            # let the handler finish, otherwise the server logs the request in
+            # whichever test comes next
+            release.set()
+            deadline = time.monotonic() + 5
+            while not httpserver.log and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+    def test_decoding_error(self, httpserver, http):
+        httpserver.expect_request("/gzip-api").respond_with_data(
+            b"not gzip", headers={"Content-Encoding": "gzip"}
+        )
+
+        with pytest.raises(rr.exceptions.ContentDecodingError):
+            http.get(httpserver.url_for("/gzip-api"))
+
+    def test_request_error(self):
+        def handler(request):
+            raise httpx.TooManyRedirects("too many redirects", request=request)
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+
+        with rr.Session() as http, client:
+            http.mount("http://", HTTP2Adapter(client=client))
+
+            with pytest.raises(rr.RequestException) as excinfo:
+                http.get("http://localhost/api")
+
+        assert isinstance(excinfo.value.__cause__, httpx.TooManyRedirects)
+
+    def test_redirect_not_followed_by_httpx(self, httpserver, http):
+        httpserver.expect_request("/old").respond_with_data(
+            status=302, headers={"Location": "/new"}
+        )
+        httpserver.expect_request("/new").respond_with_data("new")
+
+        resp = http.get(httpserver.url_for("/old"), allow_redirects=False)
+
+        assert resp.status_code == 302
+        assert http.get(httpserver.url_for("/old")).text == "new"
+
+    def test_h2(self, h2server):
+        h2server.responses = [
+            (503, {"retry-after": "0"}, b""),
+            (200, {"content-type": "application/json"}, b'{"result": "ok"}'),
+        ]
+        retries = Retry(1, backoff_factor=0, status_forcelist=(503,))
+
+        with httpx.Client(http1=False, http2=True) as client, rr.Session() as http:
+            http.mount("http://", HTTP2Adapter(max_retries=retries, client=client))
+            resp = http.get(h2server.url_for("/api"))
+
+        assert resp.status_code == 200
+        assert resp.json() == {"result": "ok"}
+        assert h2server.log == [(b"GET", b"/api"), (b"GET", b"/api")]
+
+    def test_shared_client(self):
+        assert HTTP2Adapter().client is HTTP2Adapter().client
+
+
+class TestRetryingSessionTransport:
+    @pytest.mark.parametrize(
+        "http2,setting,adapter",
+        [
+            (None, "0", HTTPAdapterWithDefaultTimeout),
+            (None, "1", HTTP2Adapter),
+            (True, "0", HTTP2Adapter),
+            (False, "1", HTTPAdapterWithDefaultTimeout),
+        ],
+    )
+    def test_adapter(self, monkeypatch, http2, setting, adapter):
+        monkeypatch.setenv("POKEPI_HTTP2", setting)
+
+        with RetryingSession(http2=http2) as http:
+            assert isinstance(http.get_adapter("https://pokeapi.co"), adapter)
+
+    def test_http2(self, httpserver):
+        httpserver.expect_request("/api").respond_with_data("ok")
+
+        with RetryingSession(max_retries=1, http2=True) as http:
+            assert http.get(httpserver.url_for("/api")).text == "ok"
@@ -13,11 +13,16 @@ from pokepi.providers.common import (
     validate,
 )
 from pokepi.providers.pokeapi import (
+    LIST_LIMIT,
+    LIST_URL,
     URL,
     VALIDATION_SCHEMA,
-    extract,
+    described_language,
     get_pokemon_species,
+    index_descriptions,
+    list_pokemon_species,
     pokeapi_processor,
+    resolve_language,
     sanitize,
 )
 
@@ -56,44 +61,43 @@ class TestValidate:
             validate(invalid_data, VALIDATION_SCHEMA)
 
 
-class TestExtract:
-    def test_english(self):
+class TestIndexDescriptions:
+    def test_longest_per_language(self):
         data = {
             "flavor_text_entries": [
-                {
-                    "flavor_text": "a_text_1",
-                    "language": {"name": "en", "url": "url_1"},
-                },
-                {
-                    "flavor_text": "a_text_2",
-                    "language": {"name": "en", "url": "url_2"},
-                },
+                {"flavor_text": "short", "language": {"name": "en", "url": "u"}},
+                {"flavor_text": "longer\ntext", "language": {"name": "en", "url": "u"}},
+                {"flavor_text": "other\ntext", "language": {"name": "en", "url": "u"}},
+                {"flavor_text": "corto", "language": {"name": "it", "url": "u"}},
+                {"flavor_text": "", "language": {"name": "ja", "url": "u"}},
             ]
         }
 
-        expected_data = ["a_text_1", "a_text_2"]
-
-        assert extract(data) == expected_data
-
-    def test_any_language(self):
-        data = {
-            "flavor_text_entries": [
-                {
-                    "flavor_text": "a_text_1",
-                    "language": {"name": "it", "url": "url_1"},
-                },
-                {
-                    "flavor_text": "a_text_2",
-                    "language": {"name": "de", "url": "url_2"},
-                },
-                {
-                    "flavor_text": "a_text_3",
-                    "language": {"name": "en", "url": "url_3"},
-                },
-            ]
+        assert index_descriptions(data) == {
+            "en": "longer text",
+            "it": "corto",
+            "ja": "",
         }
 
-        assert extract(data) == ["a_text_3"]
+
+class TestResolveLanguage:
+    @pytest.mark.parametrize(
+        "language,expected",
+        [
+            ("en", "en"),
+            ("en-US", "en"),
+            ("EN-gb", "en"),
+            ("ja-Hrkt", "ja-Hrkt"),
+            ("ja-hrkt", "ja-Hrkt"),
+            ("ja-JP", "ja"),
+            ("pt-BR", "pt-BR"),
+            ("pt", None),
+            ("xx", None),
+            ("", None),
+        ],
+    )
+    def test_resolve(self, language, expected):
+        assert resolve_language(language) == expected
 
 
 class TestGetPokemonSpecies:
@@ -153,6 +157,45 @@ class TestGetPokemonSpecies:
             get_pokemon_species(name)
 
 
+class TestListPokemonSpecies:
+    def test_ok(self, retrying_response):
+        retrying_response.add(
+            responses.GET,
+            LIST_URL.format(limit=LIST_LIMIT),
+            json={
+                "count": 2,
+                "results": [
+                    {"name": "bulbasaur", "url": "url_1"},
+                    {"name": "ivysaur", "url": "url_2"},
+                ],
+            },
+            status=200,
+        )
+
+        assert list_pokemon_species() == ["bulbasaur", "ivysaur"]
+
+    def test_unexpected_error(self, retrying_response):
+        retrying_response.add(
+            responses.GET,
+            LIST_URL.format(limit=LIST_LIMIT),
+            body=rr.ConnectionError("Connection error"),
+        )
+
+        with pytest.raises(ProviderError, match="Unexpected error from PokeAPI"):
+            list_pokemon_species()
+
+    def test_validation_error(self, retrying_response):
+        retrying_response.add(
+            responses.GET,
+            LIST_URL.format(limit=LIST_LIMIT),
+            json={"results": [{}]},
+            status=200,
+        )
+
+        with pytest.raises(ValidationError):
+            list_pokemon_species()
+
+
 class TestPokeapiProcessor:
     def test_ok(self, retrying_response, datadir):
         name = "ditto"
@@ -197,7 +240,7 @@ DITTO rearranges its cell structure to transform itself into other shapes. Howev
         with pytest.raises(ValidationError):
             pokeapi_processor(name)
 
-    def test_unexpected_error(self, retrying_response, datadir):
+    def test_no_descriptions(self, retrying_response, datadir):
         name = "ditto"
         data = (datadir / "ditto-empty-descriptions.json").read_text()
 
@@ -209,5 +252,46 @@ DITTO rearranges its cell structure to transform itself into other shapes. Howev
             status=200,
         )
 
-        with pytest.raises(IndexError, match="list index out of range"):
+        with pytest.raises(
+            ResourceNotFound, match="No 'en' description for Pokemon 'ditto'"
+        ):
             pokeapi_processor(name)
+
+    def test_languages_fetched_once(self, retrying_response, datadir):
+        name = "ditto"
+        data = (datadir / "ditto.json").read_text()
+
+        retrying_response.add(
+            responses.GET,
+            URL.format(name=name),
+            body=data,
+            content_type="application/json",
+            status=200,
+        )
+
+        assert pokeapi_processor(name, "fr").startswith("Métamorph peut")
+        assert pokeapi_processor(name, "en-US").startswith("DITTO")
+        assert len(retrying_response.calls) == 1
+
+    def test_unknown_language(self, retrying_response):
+        with pytest.raises(ResourceNotFound, match="Unknown language 'xx'"):
+            pokeapi_processor("ditto", "xx")
+
+        assert len(retrying_response.calls) == 0
+
+
+class TestDescribedLanguage:
+    @pytest.mark.parametrize(
+        "languages,expected",
+        [(["fr", "en"], "fr"), (["pt-BR", "de", "en"], "de"), (["pt-BR", "cs"], "en")],
+    )
+    def test_described_language(self, retrying_response, datadir, languages, expected):
+        retrying_response.add(
+            responses.GET,
+            URL.format(name="ditto"),
+            body=(datadir / "ditto.json").read_text(),
+            content_type="application/json",
+            status=200,
+        )
+
+        assert described_language("ditto", languages) == expected
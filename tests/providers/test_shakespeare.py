@@ -54,6 +54,39 @@ class TestGetTranslation:
         ):
             get_translation(text)
 
+    @pytest.mark.parametrize("status,headers", [(503, {}), (429, {"Retry-After": "0"})])
+    def test_retried(self, monkeypatch, httpserver, status, headers):
+        expected = {"contents": {"translated": "translated_text"}}
+        monkeypatch.setattr(
+            "pokepi.providers.shakespeare.URL", httpserver.url_for("/translate")
+        )
+        monkeypatch.setenv("POKEPI_SHAKESPEARE_BACKOFF_FACTOR", "0")
+        # Let the provider create its policy afresh, with the settings above.
+        monkeypatch.setattr("pokepi.providers.common._RETRY_POLICIES", {})
+
+        httpserver.expect_ordered_request(
+            "/translate", method="POST"
+        ).respond_with_data(status=status, headers=headers)
+        httpserver.expect_ordered_request(
+            "/translate", method="POST"
+        ).respond_with_json(expected)
+
+        assert get_translation("text") == expected
+        assert len(httpserver.log) == 2
+
+    def test_not_retried(self, monkeypatch, httpserver):
+        monkeypatch.setattr(
+            "pokepi.providers.shakespeare.URL", httpserver.url_for("/translate")
+        )
+        httpserver.expect_request("/translate", method="POST").respond_with_data(
+            status=503
+        )
+
+        with pytest.raises(ProviderError):
+            get_translation("text", retry=False)
+
+        assert len(httpserver.log) == 1
+
     def test_unexpected_error(self, retrying_response):
         text = "This is a test text."
 
@@ -0,0 +1,103 @@
+# pylint: disable=no-self-use,missing-docstring
+
+import pytest
+
+from pokepi.admission import (
+    AdmissionController,
+    Overloaded,
+    parse_request_start,
+    queue_time,
+)
+
+
+class TestParseRequestStart:
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            ("t=1600000000.123", 1600000000.123),
+            ("1600000000123", 1600000000.123),
+            ("t=1600000000123456", 1600000000.123456),
+            (" t=1600000000 ", 1600000000),
+            ("invalid", None),
+            (None, None),
+        ],
+    )
+    def test_parse(self, value, expected):
+        assert parse_request_start(value) == pytest.approx(expected)
+
+
+class TestQueueTime:
+    def test_queued(self):
+        headers = {"X-Request-Start": "t=100.5"}
+
+        assert queue_time(headers, now=lambda: 102) == 1.5
+
+    def test_clock_skew(self):
+        headers = {"X-Request-Start": "t=100.5"}
+
+        assert queue_time(headers, now=lambda: 100) == 0
+
+    def test_no_header(self):
+        assert queue_time({}) is None
+
+
+class TestAdmissionController:
+    def test_unlimited(self):
+        admission = AdmissionController()
+
+        with admission.admit(queue_time=100), admission.admit():
+            assert admission.status()["in_flight"] == 2
+
+        assert admission.status() == {
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "saturation": 0.0,
+            "shed": 0,
+        }
+
+    def test_max_in_flight(self):
+        admission = AdmissionController(max_in_flight=2)
+
+        with admission.admit(), admission.admit():
+            assert admission.status()["saturation"] == 1.0
+
+            with pytest.raises(Overloaded, match="2 requests in flight"):
+                with admission.admit():
+                    pass
+
+        with admission.admit():
+            assert admission.status()["in_flight"] == 1
+
+        assert admission.shed == 1
+
+    def test_max_queue_time(self):
+        admission = AdmissionController(max_queue_time=1)
+
+        with admission.admit(queue_time=0.5), admission.admit(queue_time=None):
+            pass
+
+        with pytest.raises(Overloaded, match="queued for 1.500s"):
+            with admission.admit(queue_time=1.5):
+                pass
+
+        assert admission.status()["in_flight"] == 0
+        assert admission.shed == 1
+
+    def test_released_on_error(self):
+        admission = AdmissionController(max_in_flight=1)
+
+        with pytest.raises(ValueError):
+            with admission.admit():
+                raise ValueError()
+
+        assert admission.in_flight == 0
+
+    def test_from_settings(self, monkeypatch):
+        monkeypatch.setenv("POKEPI_MAX_IN_FLIGHT", "8")
+        monkeypatch.setenv("POKEPI_MAX_QUEUE_TIME", "2.5")
+        monkeypatch.setenv("POKEPI_RETRY_AFTER", "5")
+
+        admission = AdmissionController.from_settings()
+
+        assert (admission.max_in_flight, admission.max_queue_time) == (8, 2.5)
+        assert admission.retry_after == 5
@@ -1,16 +1,24 @@
 # pylint: disable=no-self-use,missing-docstring
 
+import time
+
 from unittest.mock import patch
 
 import pytest
 
-from pokepi.app import app
+import pokepi.app
+
+from pokepi.admission import AdmissionController
+from pokepi.app import app, preload, profiler
+from pokepi.cache import TranslationCache
 from pokepi.providers import ProviderError, ResourceNotFound
+from pokepi.providers.pokeapi import LANGUAGES
 
 
 @pytest.fixture(name="test_app")
-def app_fixture():
+def app_fixture(monkeypatch):
     app.testing = True
+    monkeypatch.setattr("pokepi.app.cache", TranslationCache())
 
     return app
 
@@ -30,9 +38,169 @@ class TestPokemonEndpoint:
                 name="pokemon_name", description="translated_description"
             )
 
-            m_pokeapi_processor.assert_called_once_with("pokemon_name")
+            m_pokeapi_processor.assert_called_once_with("pokemon_name", "en")
             m_shakespeare_processor.assert_called_once_with("original_description")
 
+    @patch("pokepi.app.pokeapi_processor", return_value="original_description")
+    @patch(
+        "pokepi.app.shakespeare_processor",
+        return_value="translated_description",
+    )
+    def test_cached(self, m_shakespeare_processor, m_pokeapi_processor, test_app):
+        with test_app.test_client() as client:
+            for _ in range(2):
+                resp = client.get("/pokemon/pokemon_name")
+
+                assert resp.status_code == 200
+                assert resp.json == dict(
+                    name="pokemon_name", description="translated_description"
+                )
+
+            m_pokeapi_processor.assert_called_once_with("pokemon_name", "en")
+            m_shakespeare_processor.assert_called_once_with("original_description")
+
+    @pytest.mark.parametrize(
+        "query,headers,language",
+        [
+            ("?language=fr", {}, "fr"),
+            ("?language=fr", {"Accept-Language": "de"}, "fr"),
+            ("?language=FR-ca", {}, "fr"),
+            ("", {"Accept-Language": "de;q=0.5, it"}, "it"),
+            ("", {"Accept-Language": "xx, de;q=0.5"}, "de"),
+            ("", {"Accept-Language": "*"}, "en"),
+            ("", {"Accept-Language": "ru-RU,ru;q=0.9"}, "en"),
+            ("", {"Accept-Language": "nl"}, "en"),
+        ],
+    )
+    @patch(
+        "pokepi.providers.pokeapi.species_descriptions",
+        return_value=dict.fromkeys(LANGUAGES, "original_description"),
+    )
+    @patch("pokepi.app.pokeapi_processor", return_value="original_description")
+    @patch(
+        "pokepi.app.shakespeare_processor",
+        return_value="translated_description",
+    )
+    def test_language(
+        self,
+        m_shakespeare_processor,
+        m_pokeapi_processor,
+        m_species_descriptions,
+        test_app,
+        query,
+        headers,
+        language,
+    ):
+        with test_app.test_client() as client:
+            resp = client.get(f"/pokemon/pokemon_name{query}", headers=headers)
+
+            assert resp.status_code == 200
+            assert resp.headers["Vary"] == "Accept-Language"
+
+            m_pokeapi_processor.assert_called_once_with("pokemon_name", language)
+            m_shakespeare_processor.assert_called_once_with("original_description")
+
+    @pytest.mark.parametrize(
+        "query,headers",
+        [
+            ("", {"Accept-Language": "en-US,en;q=0.9"}),
+            ("?language=en-x0", {}),
+            ("?language=EN", {}),
+        ],
+    )
+    @patch("pokepi.app.pokeapi_processor")
+    @patch("pokepi.app.shakespeare_processor")
+    def test_cached_resolved_language(
+        self, m_shakespeare_processor, m_pokeapi_processor, test_app, query, headers
+    ):
+        pokepi.app.cache.put("ditto", "pretranslated", "en")
+
+        with test_app.test_client() as client:
+            resp = client.get(f"/pokemon/ditto{query}", headers=headers)
+
+            assert resp.status_code == 200
+            assert resp.json["description"] == "pretranslated"
+
+        m_pokeapi_processor.assert_not_called()
+        m_shakespeare_processor.assert_not_called()
+        assert len(pokepi.app.cache) == 1
+
+    @pytest.mark.parametrize(
+        "accept_language,language",
+        [
+            ("pt-BR,en;q=0.5", "en"),
+            ("pt-BR,fr;q=0.5", "fr"),
+            ("pt-BR,de;q=0.5", "en"),
+            ("xx, yy", "en"),
+        ],
+    )
+    @patch(
+        "pokepi.providers.pokeapi.species_descriptions",
+        return_value={"en": "description", "fr": "description"},
+    )
+    @patch("pokepi.app.pokeapi_processor", return_value="original_description")
+    @patch(
+        "pokepi.app.shakespeare_processor",
+        return_value="translated_description",
+    )
+    def test_language_fallback(
+        self,
+        m_shakespeare_processor,
+        m_pokeapi_processor,
+        m_species_descriptions,
+        test_app,
+        accept_language,
+        language,
+    ):
+        with test_app.test_client() as client:
+            resp = client.get(
+                "/pokemon/ditto", headers={"Accept-Language": accept_language}
+            )
+
+            assert resp.status_code == 200
+
+        m_pokeapi_processor.assert_called_once_with("ditto", language)
+        assert pokepi.app.cache.get("ditto", language) == "translated_description"
+
+    @patch(
+        "pokepi.providers.pokeapi.species_descriptions",
+        return_value={"en": "description"},
+    )
+    @patch("pokepi.app.pokeapi_processor")
+    @patch("pokepi.app.shakespeare_processor")
+    def test_cached_fallback(
+        self,
+        m_shakespeare_processor,
+        m_pokeapi_processor,
+        m_species_descriptions,
+        test_app,
+    ):
+        pokepi.app.cache.put("ditto", "pretranslated", "en")
+
+        with test_app.test_client() as client:
+            resp = client.get("/pokemon/ditto", headers={"Accept-Language": "pt-BR"})
+
+            assert resp.status_code == 200
+            assert resp.json["description"] == "pretranslated"
+
+        m_species_descriptions.assert_called_once_with("ditto")
+        m_pokeapi_processor.assert_not_called()
+        m_shakespeare_processor.assert_not_called()
+
+    @patch("pokepi.app.pokeapi_processor")
+    @patch("pokepi.app.shakespeare_processor")
+    def test_unknown_language(
+        self, m_shakespeare_processor, m_pokeapi_processor, test_app
+    ):
+        with test_app.test_client() as client:
+            resp = client.get("/pokemon/ditto?language=xx")
+
+            assert resp.status_code == 404
+
+        m_pokeapi_processor.assert_not_called()
+        m_shakespeare_processor.assert_not_called()
+        assert len(pokepi.app.cache) == 0
+
     @patch("pokepi.app.pokeapi_processor", side_effect=ResourceNotFound)
     @patch(
         "pokepi.app.shakespeare_processor",
@@ -48,7 +216,7 @@ class TestPokemonEndpoint:
                 description="The requested URL was not found on the server. If you entered the URL manually please check your spelling and try again.",
             )
 
-            m_pokeapi_processor.assert_called_once_with("not_found")
+            m_pokeapi_processor.assert_called_once_with("not_found", "en")
             m_shakespeare_processor.assert_not_called()
 
     @patch("pokepi.app.pokeapi_processor", side_effect=ProviderError)
@@ -68,14 +236,179 @@ class TestPokemonEndpoint:
                 description="The server encountered an internal error and was unable to complete your request. Either the server is overloaded or there is an error in the application.",
             )
 
-            m_pokeapi_processor.assert_called_once_with("unexpected_error")
+            m_pokeapi_processor.assert_called_once_with("unexpected_error", "en")
             m_shakespeare_processor.assert_not_called()
 
 
 class TestHealthCheck:
-    def test_ok(self, test_app):
+    def test_ok(self, monkeypatch, test_app):
+        retries = {"pokeapi": {"retries": 1}}
+        monkeypatch.setattr("pokepi.app.retry_status", lambda: retries)
+
         with test_app.test_client() as client:
             resp = client.get("/health")
 
             assert resp.status_code == 200
-            assert resp.json == dict(health="ok")
+            assert resp.json == dict(
+                health="ok",
+                in_flight=0,
+                max_in_flight=0,
+                saturation=0.0,
+                shed=0,
+                retries=retries,
+            )
+
+    def test_saturation(self, monkeypatch, test_app):
+        admission = AdmissionController(4)
+        monkeypatch.setattr("pokepi.app.admission", admission)
+
+        with admission.admit():
+            with test_app.test_client() as client:
+                resp = client.get("/health")
+
+        assert resp.json["in_flight"] == 1
+        assert resp.json["saturation"] == 0.25
+
+
+class TestAdmission:
+    @pytest.fixture(name="admission")
+    def fixture_admission(self, monkeypatch):
+        admission = AdmissionController(
+            max_in_flight=1, max_queue_time=5, retry_after=3
+        )
+        monkeypatch.setattr("pokepi.app.admission", admission)
+
+        return admission
+
+    @patch("pokepi.app.pokeapi_processor", return_value="original_description")
+    @patch(
+        "pokepi.app.shakespeare_processor",
+        return_value="translated_description",
+    )
+    def test_overloaded(
+        self, m_shakespeare_processor, m_pokeapi_processor, admission, test_app
+    ):
+        with admission.admit(), test_app.test_client() as client:
+            resp = client.get("/pokemon/pokemon_name")
+
+            assert resp.status_code == 503
+            assert resp.headers["Retry-After"] == "3"
+            assert resp.json["code"] == 503
+
+            m_pokeapi_processor.assert_not_called()
+            m_shakespeare_processor.assert_not_called()
+
+        assert admission.shed == 1
+
+    @patch("pokepi.app.pokeapi_processor", return_value="original_description")
+    @patch(
+        "pokepi.app.shakespeare_processor",
+        return_value="translated_description",
+    )
+    def test_queued_too_long(
+        self, m_shakespeare_processor, m_pokeapi_processor, admission, test_app
+    ):
+        with test_app.test_client() as client:
+            resp = client.get(
+                "/pokemon/pokemon_name",
+                headers={"X-Request-Start": f"t={time.time() - 10:.3f}"},
+            )
+
+            assert resp.status_code == 503
+
+            m_pokeapi_processor.assert_not_called()
+
+    @patch("pokepi.app.pokeapi_processor")
+    def test_cache_hit_admitted(self, m_pokeapi_processor, admission, test_app):
+        pokepi.app.cache.put("pokemon_name", "cached_description")
+
+        with admission.admit(), test_app.test_client() as client:
+            resp = client.get(
+                "/pokemon/pokemon_name",
+                headers={"X-Request-Start": f"t={time.time() - 10:.3f}"},
+            )
+
+            assert resp.status_code == 200
+            assert resp.json["description"] == "cached_description"
+
+            m_pokeapi_processor.assert_not_called()
+
+
+class TestRequestId:
+    def test_generated(self, test_app):
+        with test_app.test_client() as client:
+            resp = client.get("/health")
+
+            assert len(resp.headers["X-Request-ID"]) == 32
+
+    def test_propagated(self, test_app):
+        with test_app.test_client() as client:
+            resp = client.get("/health", headers={"X-Request-ID": "request-id"})
+
+            assert resp.headers["X-Request-ID"] == "request-id"
+
+
+class TestProfiles:
+    @pytest.fixture(name="profiler")
+    def fixture_profiler(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(profiler, "directory", tmp_path)
+        monkeypatch.setattr(profiler, "token", "secret")
+
+        return profiler
+
+    @patch("pokepi.app.pokeapi_processor", return_value="original_description")
+    @patch(
+        "pokepi.app.shakespeare_processor",
+        return_value="translated_description",
+    )
+    def test_profile_and_download(
+        self, m_shakespeare_processor, m_pokeapi_processor, profiler, test_app
+    ):
+        auth = {"Authorization": "Bearer secret"}
+
+        with test_app.test_client() as client:
+            client.get("/pokemon/ditto", headers={"X-Pokepi-Profile": "secret"})
+
+            resp = client.get("/admin/profiles", headers=auth)
+            (profile,) = resp.json["profiles"]
+
+            assert resp.status_code == 200
+            assert profile["name"].endswith(".prof")
+
+            resp = client.get(f"/admin/profiles/{profile['name']}", headers=auth)
+
+            assert resp.status_code == 200
+            assert resp.content_type == "application/octet-stream"
+            assert len(resp.data) == profile["size"]
+
+            resp = client.get(
+                f"/admin/profiles/{profile['name']}?format=text", headers=auth
+            )
+
+            assert "pokemon_endpoint" in resp.get_data(as_text=True)
+
+    def test_not_found(self, profiler, test_app):
+        with test_app.test_client() as client:
+            resp = client.get(
+                "/admin/profiles/missing.prof",
+                headers={"Authorization": "Bearer secret"},
+            )
+
+            assert resp.status_code == 404
+
+    @pytest.mark.parametrize(
+        "authorization", [None, "Bearer wrong", "Basic secret", "Bearer é"]
+    )
+    def test_unauthorized(self, profiler, test_app, authorization):
+        headers = {"Authorization": authorization} if authorization else {}
+
+        with test_app.test_client() as client:
+            assert client.get("/admin/profiles", headers=headers).status_code == 404
+
+
+class TestPreload:
+    @patch("pokepi.providers.preload")
+    def test_preload(self, m_preload_providers):
+        preload()
+
+        m_preload_providers.assert_called_once_with()
@@ -0,0 +1,111 @@
+# pylint: disable=no-self-use,missing-docstring
+
+import io
+import json
+
+from pokepi.cache import TranslationCache, read_records, write_record
+
+
+RECORD = {
+    "name": "ditto",
+    "language": "en",
+    "description": "description",
+    "translation": "translation",
+}
+
+
+class TestRecords:
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "index.jsonl"
+
+        with open(path, "w", encoding="utf-8") as stream:
+            write_record(stream, RECORD)
+            write_record(stream, dict(RECORD, name="mew"))
+
+        assert [record["name"] for record in read_records(path)] == ["ditto", "mew"]
+
+    def test_write_unicode(self):
+        stream = io.StringIO()
+
+        write_record(stream, dict(RECORD, translation="POKéMON"))
+
+        assert (
+            stream.getvalue()
+            == json.dumps(dict(RECORD, translation="POKéMON"), ensure_ascii=False)
+            + "\n"
+        )
+
+    def test_invalid_records(self, tmp_path):
+        path = tmp_path / "index.jsonl"
+        path.write_text(
+            "\n".join(
+                [
+                    json.dumps(RECORD),
+                    json.dumps({"name": "missing-translation"}),
+                    json.dumps(["not", "an", "object"]),
+                    '{"name": "trunc',
+                ]
+            )
+        )
+
+        assert list(read_records(path)) == [RECORD]
+
+    def test_skipped_records(self, tmp_path):
+        path = tmp_path / "index.jsonl"
+        skipped = {"name": "mew", "language": "cs", "skipped": True}
+        path.write_text(json.dumps(RECORD) + "\n" + json.dumps(skipped) + "\n")
+
+        assert list(read_records(path)) == [RECORD]
+        assert list(read_records(path, skipped=True)) == [RECORD, skipped]
+        assert len(TranslationCache.load(path)) == 1
+
+    def test_default_language(self, tmp_path):
+        path = tmp_path / "index.jsonl"
+        path.write_text(json.dumps({"name": "ditto", "translation": "translation"}))
+
+        assert [record["language"] for record in read_records(path)] == ["en"]
+
+
+class TestTranslationCache:
+    def test_get_put(self):
+        cache = TranslationCache()
+
+        assert cache.get("ditto") is None
+
+        cache.put("ditto", "translation")
+
+        assert cache.get("ditto") == "translation"
+        assert ("ditto", "en") in cache
+        assert len(cache) == 1
+
+    def test_languages(self):
+        cache = TranslationCache()
+
+        cache.put("ditto", "traduzione", "it")
+
+        assert cache.get("ditto") is None
+        assert cache.get("ditto", "it") == "traduzione"
+
+    def test_from_settings(self, monkeypatch, tmp_path):
+        path = tmp_path / "index.jsonl"
+        path.write_text(json.dumps(dict(RECORD, language="it")) + "\n")
+        monkeypatch.setenv("POKEPI_CACHE_FILE", str(path))
+
+        assert TranslationCache.from_settings().get("ditto", "it") == "translation"
+
+    def test_from_settings_compressed(self, monkeypatch, tmp_path):
+        path = tmp_path / "index.jsonl"
+        path.write_text(json.dumps(RECORD) + "\n")
+        monkeypatch.setenv("POKEPI_CACHE_FILE", str(path))
+        monkeypatch.setenv("POKEPI_CACHE_COMPRESS", "true")
+
+        cache = TranslationCache.from_settings()
+
+        assert cache.get("ditto") == "translation"
+        cache.put("mew", "new translation")
+        assert cache.get("mew") == "new translation"
+
+    def test_from_settings_no_file(self, monkeypatch):
+        monkeypatch.delenv("POKEPI_CACHE_FILE", raising=False)
+
+        assert len(TranslationCache.from_settings()) == 0
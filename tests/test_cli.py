@@ -0,0 +1,163 @@
+# pylint: disable=no-self-use,missing-docstring
+
+import json
+import threading
+import time
+
+from unittest.mock import patch
+
+import pytest
+
+from pokepi.cache import read_records
+from pokepi.cli import Cancelled, RateLimiter, main, pretranslate
+from pokepi.providers import ProviderError, ResourceNotFound
+
+
+def translate(description, retry=True):
+    assert not retry
+    return description.upper()
+
+
+def describe(name, language):
+    if name == "missingno":
+        raise ResourceNotFound(name)
+    return f"{name} {language} description"
+
+
+def read_index(path):
+    return list(read_records(path))
+
+
+class TestRateLimiter:
+    def test_within_rate(self):
+        limiter = RateLimiter(2, 60)
+
+        start = time.monotonic()
+        limiter.acquire()
+        limiter.acquire()
+
+        assert time.monotonic() - start < 1
+
+    def test_throttled(self):
+        limiter = RateLimiter(1, 0.1)
+
+        start = time.monotonic()
+        limiter.acquire()
+        limiter.acquire()
+
+        assert time.monotonic() - start >= 0.1
+
+    def test_stop(self):
+        limiter = RateLimiter(1, 60)
+        limiter.acquire()
+
+        threading.Timer(0.05, limiter.stop).start()
+
+        with pytest.raises(Cancelled):
+            limiter.acquire()
+
+
+@patch("pokepi.cli.shakespeare_processor", side_effect=translate)
+@patch("pokepi.cli.pokeapi_processor", side_effect=describe)
+@patch("pokepi.cli.list_pokemon_species", return_value=["ditto", "mew", "missingno"])
+class TestPretranslate:
+    def test_all(self, _, __, ___, tmp_path):
+        path = tmp_path / "index.jsonl"
+
+        assert pretranslate(path, 2, RateLimiter(10, 1)) == (2, 1, 0)
+        assert sorted(read_index(path), key=lambda record: record["name"]) == [
+            {
+                "name": "ditto",
+                "language": "en",
+                "description": "ditto en description",
+                "translation": "DITTO EN DESCRIPTION",
+            },
+            {
+                "name": "mew",
+                "language": "en",
+                "description": "mew en description",
+                "translation": "MEW EN DESCRIPTION",
+            },
+        ]
+
+    def test_resume(self, _, m_pokeapi_processor, __, tmp_path):
+        path = tmp_path / "index.jsonl"
+        done = {"name": "ditto", "description": "old", "translation": "OLD"}
+        path.write_text(json.dumps(done) + '\n{"name": "mew", "descr')
+
+        assert pretranslate(path, 2, RateLimiter(10, 1)) == (1, 1, 0)
+
+        assert [call.args for call in m_pokeapi_processor.call_args_list] in (
+            [("mew", "en"), ("missingno", "en")],
+            [("missingno", "en"), ("mew", "en")],
+        )
+        assert [record["name"] for record in read_index(path)] == ["ditto", "mew"]
+
+    def test_resume_skipped(self, _, m_pokeapi_processor, __, tmp_path):
+        path = tmp_path / "index.jsonl"
+
+        assert pretranslate(path, 2, RateLimiter(10, 1), "cs") == (2, 1, 0)
+        assert {"name": "missingno", "language": "cs", "skipped": True} in list(
+            read_records(path, skipped=True)
+        )
+
+        m_pokeapi_processor.reset_mock()
+
+        assert pretranslate(path, 2, RateLimiter(10, 1), "cs") == (0, 0, 0)
+        m_pokeapi_processor.assert_not_called()
+
+    def test_failed(self, _, m_pokeapi_processor, __, tmp_path):
+        path = tmp_path / "index.jsonl"
+        m_pokeapi_processor.side_effect = ProviderError
+
+        assert pretranslate(path, 2, RateLimiter(10, 1)) == (0, 0, 3)
+        assert read_index(path) == []
+
+    def test_language(self, _, __, ___, tmp_path):
+        path = tmp_path / "index.jsonl"
+        done = {"name": "ditto", "language": "en", "translation": "OLD"}
+        path.write_text(json.dumps(done) + "\n")
+
+        assert pretranslate(path, 2, RateLimiter(10, 1), "it") == (2, 1, 0)
+        assert sorted(
+            (record["name"], record["language"]) for record in read_index(path)
+        ) == [("ditto", "en"), ("ditto", "it"), ("mew", "it")]
+
+
+class TestMain:
+    @patch("pokepi.cli.pretranslate", return_value=(10, 2, 0))
+    def test_ok(self, m_pretranslate, tmp_path):
+        path = str(tmp_path / "index.jsonl")
+
+        assert main(["pretranslate", "--output", path, "--workers", "3"]) == 0
+
+        args = m_pretranslate.call_args.args
+        assert args[:2] == (path, 3)
+        assert (args[2].rate, args[2].period) == (5, 3600)
+        assert args[3] == "en"
+
+    @patch("pokepi.cli.pretranslate", return_value=(0, 0, 0))
+    def test_language(self, m_pretranslate, tmp_path):
+        path = str(tmp_path / "index.jsonl")
+
+        assert main(["pretranslate", "--output", path, "--language", "FR-ca"]) == 0
+        assert m_pretranslate.call_args.args[3] == "fr"
+
+        with pytest.raises(SystemExit):
+            main(["pretranslate", "--output", path, "--language", "xx"])
+
+    @patch("pokepi.cli.pretranslate", return_value=(10, 0, 1))
+    def test_failures(self, _, tmp_path):
+        assert main(["pretranslate", "--output", str(tmp_path / "index.jsonl")]) == 1
+
+    @patch("pokepi.cli.pretranslate", side_effect=ProviderError)
+    def test_listing_error(self, _, tmp_path):
+        assert main(["pretranslate", "--output", str(tmp_path / "index.jsonl")]) == 1
+
+    def test_output_from_settings(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("POKEPI_CACHE_FILE", str(tmp_path / "index.jsonl"))
+
+        with patch("pokepi.cli.pretranslate", return_value=(0, 0, 0)) as m_pretranslate:
+            assert main(["pretranslate"]) == 0
+
+        assert m_pretranslate.call_args.args[0] == str(tmp_path / "index.jsonl")
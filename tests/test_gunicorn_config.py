@@ -0,0 +1,27 @@
+# pylint: disable=no-self-use,missing-docstring
+
+from unittest.mock import patch
+
+from pokepi import gunicorn_config
+
+
+class TestWhenReady:
+    @patch("pokepi.gunicorn_config.gc.freeze")
+    @patch("pokepi.app.preload")
+    def test_preload(self, m_preload, m_freeze, monkeypatch):
+        monkeypatch.setattr(gunicorn_config, "preload_app", True)
+
+        gunicorn_config.when_ready(None)
+
+        m_preload.assert_called_once_with()
+        m_freeze.assert_called_once_with()
+
+    @patch("pokepi.gunicorn_config.gc.freeze")
+    @patch("pokepi.app.preload")
+    def test_no_preload(self, m_preload, m_freeze, monkeypatch):
+        monkeypatch.setattr(gunicorn_config, "preload_app", False)
+
+        gunicorn_config.when_ready(None)
+
+        m_preload.assert_not_called()
+        m_freeze.assert_not_called()
@@ -0,0 +1,157 @@
+# pylint: disable=no-self-use,missing-docstring
+
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+import pytest
+
+from flask import Flask, g
+
+from pokepi.log import (
+    DroppingQueueHandler,
+    LoggingPipeline,
+    RateLimitFilter,
+    RequestIdFilter,
+    configure_logging,
+    json_handler,
+)
+
+
+def make_record(msg="message %s", args=("arg",), exc_info=None, name="pokepi.test"):
+    return logging.LogRecord(name, logging.ERROR, __file__, 1, msg, args, exc_info)
+
+
+class TestRateLimitFilter:
+    def test_rate_limited(self, clock):
+        rate_limit = RateLimitFilter(2, 10, clock=clock)
+
+        assert [rate_limit.filter(make_record()) for _ in range(4)] == [
+            True,
+            True,
+            False,
+            False,
+        ]
+
+        clock.now = 10
+        record = make_record()
+
+        assert rate_limit.filter(record)
+        assert record.suppressed == 2
+
+    def test_different_records(self, clock):
+        rate_limit = RateLimitFilter(1, 10, clock=clock)
+
+        assert rate_limit.filter(make_record())
+        assert rate_limit.filter(make_record(msg="another message"))
+        assert rate_limit.filter(make_record(name="pokepi.other"))
+        assert not rate_limit.filter(make_record(args=("another arg",)))
+
+    def test_exception_type(self, clock):
+        rate_limit = RateLimitFilter(1, 10, clock=clock)
+
+        assert rate_limit.filter(make_record(exc_info=(ValueError, None, None)))
+        assert rate_limit.filter(make_record(exc_info=(KeyError, None, None)))
+        assert not rate_limit.filter(make_record(exc_info=(KeyError, None, None)))
+
+
+class TestRequestIdFilter:
+    def test_in_request(self):
+        app = Flask(__name__)
+        record = make_record()
+
+        with app.test_request_context():
+            g.request_id = "request-id"
+            assert RequestIdFilter().filter(record)
+
+        assert record.request_id == "request-id"
+
+    def test_outside_request(self):
+        record = make_record()
+
+        assert RequestIdFilter().filter(record)
+        assert record.request_id is None
+
+
+class TestDroppingQueueHandler:
+    def test_prepare(self):
+        handler = DroppingQueueHandler(queue.Queue())
+
+        try:
+            raise ValueError("error")
+        except ValueError as exc:
+            record = make_record(exc_info=(type(exc), exc, exc.__traceback__))
+
+        prepared = handler.prepare(record)
+
+        assert prepared.msg == "message arg"
+        assert prepared.args is None
+        assert prepared.exc_info is not None
+        assert prepared.exc_text is None
+
+    def test_queue_full(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+
+        handler.handle(make_record())
+        handler.handle(make_record())
+
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 1
+
+
+class TestLoggingPipeline:
+    @pytest.mark.parametrize("restart", [False, True])
+    def test_json_output(self, restart):
+        stream = io.StringIO()
+        pipeline = LoggingPipeline(json_handler(stream), 10)
+        pipeline.handler.addFilter(RequestIdFilter())
+        pipeline.start()
+
+        if restart:
+            pipeline.restart_after_fork()
+
+        try:
+            raise ValueError("error")
+        except ValueError as exc:
+            pipeline.handler.handle(
+                make_record(exc_info=(type(exc), exc, exc.__traceback__))
+            )
+
+        pipeline.stop()
+
+        output = json.loads(stream.getvalue())
+        assert output["message"] == "message arg"
+        assert output["levelname"] == "ERROR"
+        assert output["request_id"] is None
+        assert "ValueError: error" in output["exc_info"]
+
+
+class TestConfigureLogging:
+    def test_idempotent(self):
+        stream = io.StringIO()
+        pipeline = configure_logging("pokepi.test-configure", stream)
+
+        assert configure_logging("pokepi.test-configure") is pipeline
+
+        logging.getLogger("pokepi.test-configure").warning("once")
+        pipeline.stop()
+
+        assert len(logging.getLogger("pokepi.test-configure").handlers) == 1
+        assert stream.getvalue().count('"message": "once"') == 1
+
+    def test_no_propagation(self):
+        stream = io.StringIO()
+        root_handler = logging.handlers.BufferingHandler(10)
+        logging.getLogger().addHandler(root_handler)
+        try:
+            pipeline = configure_logging("pokepi.test-propagate", stream)
+            logging.getLogger("pokepi.test-propagate").warning("once")
+            pipeline.stop()
+        finally:
+            logging.getLogger().removeHandler(root_handler)
+
+        assert not logging.getLogger("pokepi.test-propagate").propagate
+        assert root_handler.buffer == []
+        assert stream.getvalue().count('"message": "once"') == 1
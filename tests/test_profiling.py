@@ -0,0 +1,113 @@
+# pylint: disable=no-self-use,missing-docstring
+
+import pstats
+
+import pytest
+
+from flask import Flask, g
+
+from pokepi.profiling import Profiler, check_token
+
+
+@pytest.fixture(name="flask_app")
+def fixture_flask_app():
+    return Flask(__name__)
+
+
+def view(value):
+    return value
+
+
+class TestCheckToken:
+    def test_match(self):
+        assert check_token("secret", "secret")
+
+    def test_mismatch(self):
+        assert not check_token("secret", "wrong")
+        assert not check_token("secret", None)
+
+    def test_non_ascii(self):
+        assert not check_token("secret", "sécret")
+        assert check_token("sécret", "sécret")
+
+    def test_no_token(self):
+        assert not check_token(None, "")
+        assert not check_token("", "")
+
+
+class TestProfiler:
+    def test_disabled(self, flask_app):
+        profiler = Profiler(token="secret", sample_rate=1)
+
+        with flask_app.test_request_context(headers={"X-Pokepi-Profile": "secret"}):
+            assert not profiler.should_profile()
+
+        assert profiler.profiles() == []
+
+    def test_header(self, flask_app, tmp_path):
+        profiler = Profiler(directory=tmp_path, token="secret")
+
+        with flask_app.test_request_context(headers={"X-Pokepi-Profile": "secret"}):
+            assert profiler.should_profile()
+
+        with flask_app.test_request_context(headers={"X-Pokepi-Profile": "wrong"}):
+            assert not profiler.should_profile()
+
+    def test_sampling(self, flask_app, tmp_path):
+        profiler = Profiler(
+            directory=tmp_path, sample_rate=0.1, rand=iter([0.05, 0.5]).__next__
+        )
+
+        with flask_app.test_request_context():
+            assert profiler.should_profile()
+            assert not profiler.should_profile()
+
+    def test_profiled(self, flask_app, tmp_path):
+        profiler = Profiler(directory=tmp_path, sample_rate=1)
+
+        with flask_app.test_request_context():
+            g.request_id = "request/id"
+            assert profiler.profiled(view)("result") == "result"
+
+        (path,) = profiler.profiles()
+
+        assert path.name.endswith("-view-request_id.prof")
+        assert pstats.Stats(str(path)).total_calls > 0
+        assert profiler.find(path.name) == path
+        assert "view" in profiler.summary(path)
+
+    def test_long_request_id(self, flask_app, tmp_path):
+        profiler = Profiler(directory=tmp_path, sample_rate=1)
+
+        with flask_app.test_request_context():
+            g.request_id = "x" * 300
+            assert profiler.profiled(view)("result") == "result"
+
+        (path,) = profiler.profiles()
+
+        assert path.name.endswith(f"-view-{'x' * 64}.prof")
+
+    def test_save_error(self, flask_app, tmp_path):
+        directory = tmp_path / "file"
+        directory.write_text("not a directory")
+        profiler = Profiler(directory=directory, sample_rate=1)
+
+        with flask_app.test_request_context():
+            assert profiler.profiled(view)("result") == "result"
+
+    def test_rotation(self, flask_app, tmp_path):
+        profiler = Profiler(directory=tmp_path, sample_rate=1, max_files=2)
+
+        with flask_app.test_request_context():
+            for _ in range(3):
+                profiler.profiled(view)(None)
+
+        assert len(profiler.profiles()) == 2
+
+    def test_concurrent(self, flask_app, tmp_path):
+        profiler = Profiler(directory=tmp_path, sample_rate=1)
+
+        with flask_app.test_request_context():
+            profiler.profiled(lambda: profiler.profiled(view)(None))()
+
+        assert len(profiler.profiles()) == 1
@@ -0,0 +1,60 @@
+# pylint: disable=no-self-use,missing-docstring
+
+import pytest
+
+from pokepi.settings import env_bool, env_float, env_int, env_str
+
+
+class TestEnvStr:
+    def test_set(self, monkeypatch):
+        monkeypatch.setenv("POKEPI_TEST", "value")
+
+        assert env_str("TEST") == "value"
+
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv("POKEPI_TEST", raising=False)
+
+        assert env_str("TEST", "default") == "default"
+
+
+class TestEnvBool:
+    @pytest.mark.parametrize("value", ["1", "true", "Yes", "ON"])
+    def test_true(self, monkeypatch, value):
+        monkeypatch.setenv("POKEPI_TEST", value)
+
+        assert env_bool("TEST") is True
+
+    @pytest.mark.parametrize("value", ["0", "false", "No", "OFF", ""])
+    def test_false(self, monkeypatch, value):
+        monkeypatch.setenv("POKEPI_TEST", value)
+
+        assert env_bool("TEST", True) is False
+
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv("POKEPI_TEST", raising=False)
+
+        assert env_bool("TEST", True) is True
+
+    def test_invalid(self, monkeypatch):
+        monkeypatch.setenv("POKEPI_TEST", "maybe")
+
+        with pytest.raises(ValueError, match="POKEPI_TEST"):
+            env_bool("TEST")
+
+
+class TestEnvNumbers:
+    def test_int(self, monkeypatch):
+        monkeypatch.setenv("POKEPI_TEST", "42")
+
+        assert env_int("TEST") == 42
+
+    def test_float(self, monkeypatch):
+        monkeypatch.setenv("POKEPI_TEST", "0.5")
+
+        assert env_float("TEST") == 0.5
+
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv("POKEPI_TEST", raising=False)
+
+        assert env_int("TEST", 1) == 1
+        assert env_float("TEST", 1.5) == 1.5
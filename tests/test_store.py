@@ -0,0 +1,95 @@
+# pylint: disable=no-self-use,missing-docstring
+
+import threading
+
+import pytest
+
+from pokepi.store import TextStore, sample_zdict
+
+
+TEXTS = [
+    "Capable of copying an enemy's genome to instantly transform itself.",
+    "When it spots an enemy, its body transfigures into an almost perfect copy.",
+    "Its transformation ability is perfect. However, if made to laugh, it "
+    "can't maintain its disguise.",
+]
+
+
+@pytest.fixture(name="store", params=[False, True], ids=["plain", "compressed"])
+def fixture_store(request):
+    return TextStore(request.param, sample_zdict(TEXTS))
+
+
+class TestSampleZdict:
+    def test_sample(self):
+        assert sample_zdict(["abc", "dé"]) == "abcdé".encode("utf-8")
+
+    def test_size(self):
+        assert sample_zdict(TEXTS, 10) == TEXTS[0].encode("utf-8")[:10]
+
+
+class TestTextStore:
+    def test_get_put(self, store):
+        assert store.get("ditto", "en") is None
+
+        store.put("ditto", "en", TEXTS[0])
+        store.put("mew", "en", TEXTS[1])
+        store.put("ditto", "it", "Può copiare il genoma di un nemico.")
+
+        assert store.get("ditto", "en") == TEXTS[0]
+        assert store.get("mew", "en") == TEXTS[1]
+        assert store.get("ditto", "it") == "Può copiare il genoma di un nemico."
+        assert store.get("mew", "it") is None
+        assert ("ditto", "it") in store
+        assert ("mew", "it") not in store
+        assert len(store) == 3
+
+    def test_replace(self, store):
+        store.put("ditto", "en", TEXTS[0])
+        store.put("ditto", "en", TEXTS[2])
+
+        assert store.get("ditto", "en") == TEXTS[2]
+        assert len(store) == 1
+
+    def test_empty_text(self, store):
+        store.put("ditto", "en", "")
+
+        assert store.get("ditto", "en") == ""
+
+    def test_compressed(self):
+        plain = TextStore()
+        compressed = TextStore(True, sample_zdict(TEXTS))
+
+        for store in (plain, compressed):
+            for number, text in enumerate(TEXTS):
+                store.put(f"species-{number}", "en", text)
+
+        assert compressed.nbytes < plain.nbytes / 2
+
+    def test_interned_names(self, store):
+        name = "".join(["dit", "to"])
+
+        store.put(name, "en", TEXTS[0])
+        store.put("".join(["dit", "to"]), "it", TEXTS[1])
+
+        # pylint: disable=protected-access
+        names = [next(iter(positions)) for positions in store._positions.values()]
+        assert names[0] is names[1]
+
+    def test_concurrent_puts(self, store):
+        def put(thread):
+            for number in range(100):
+                store.put(f"{thread}-{number}", "en", TEXTS[number % 3])
+
+        threads = [threading.Thread(target=put, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(store) == 400
+        assert all(
+            store.get(f"{thread}-{number}", "en") == TEXTS[number % 3]
+            for thread in range(4)
+            for number in range(100)
+        )
@@ -0,0 +1,128 @@
+# pylint: disable=no-self-use,missing-docstring
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from flask import Flask
+
+from pokepi.tracing import (
+    TracingError,
+    TracingMiddleware,
+    add_event,
+    configure_tracing,
+    inject_headers,
+    span,
+    traced,
+)
+
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+TRACEPARENT = f"00-{TRACE_ID}-b7ad6b7169203331-01"
+
+
+class TestSpan:
+    def test_nested(self, spans):
+        with span("parent", {"key": "value"}):
+            with span("child"):
+                add_event("event", {"attempt": 1})
+
+        parent, child = spans.get("parent"), spans.get("child")
+
+        assert parent.attributes["key"] == "value"
+        assert child.parent.span_id == parent.context.span_id
+        assert [event.name for event in child.events] == ["event"]
+
+    def test_traced(self, spans):
+        @traced("function")
+        def function(value):
+            return value
+
+        assert function(1) == 1
+        assert spans.names() == ["function"]
+
+
+class TestInjectHeaders:
+    def test_traceparent(self, spans):
+        headers = {}
+
+        with span("client"):
+            inject_headers(headers)
+
+        context = spans.get("client").context
+        assert headers["traceparent"].startswith(
+            f"00-{context.trace_id:032x}-{context.span_id:016x}-"
+        )
+
+
+class TestTracingMiddleware:
+    @pytest.fixture(name="client")
+    def fixture_client(self):
+        app = Flask(__name__)
+        app.wsgi_app = TracingMiddleware(app.wsgi_app)
+
+        @app.route("/")
+        def index():
+            with span("handler"):
+                return "ok"
+
+        return app.test_client()
+
+    def test_server_span(self, client, spans):
+        client.get("/")
+
+        server, handler = spans.get("HTTP GET"), spans.get("handler")
+
+        assert server.attributes["http.status_code"] == 200
+        assert server.attributes["http.target"] == "/"
+        assert handler.parent.span_id == server.context.span_id
+
+    def test_propagated_context(self, client, spans):
+        client.get("/", headers={"traceparent": TRACEPARENT})
+
+        assert f"{spans.get('HTTP GET').context.trace_id:032x}" == TRACE_ID
+
+
+class TestConfigureTracing:
+    def test_disabled(self, monkeypatch):
+        monkeypatch.delenv("POKEPI_TRACING_EXPORTER", raising=False)
+
+        assert configure_tracing() is None
+
+    def test_disabled_not_imported(self, monkeypatch):
+        monkeypatch.delenv("POKEPI_TRACING_EXPORTER", raising=False)
+
+        imported = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, pokepi.app; print('opentelemetry' in sys.modules)",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        assert imported.strip() == "False"
+
+    def test_unknown_exporter(self, monkeypatch):
+        monkeypatch.setenv("POKEPI_TRACING_EXPORTER", "unknown")
+
+        with pytest.raises(TracingError, match="unknown"):
+            configure_tracing()
+
+    def test_file(self, monkeypatch, tmp_path):
+        path = tmp_path / "spans.jsonl"
+        monkeypatch.setenv("POKEPI_TRACING_EXPORTER", "file")
+        monkeypatch.setenv("POKEPI_TRACING_FILE", str(path))
+        # The global provider can be set just once: let the tests' one win.
+        monkeypatch.setattr("opentelemetry.trace.set_tracer_provider", lambda _: None)
+
+        provider = configure_tracing()
+        with provider.get_tracer(__name__).start_as_current_span("exported"):
+            pass
+        provider.shutdown()
+
+        assert json.loads(path.read_text())["name"] == "exported"